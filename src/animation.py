@@ -0,0 +1,111 @@
+# Imports
+import numpy as np
+
+from constants import *
+from dogs import DOG_TYPES, DIRECTIONS, DIRECTION_IDS
+
+
+# Movement to sprite direction, checked in order (a later match overrides an earlier one, so diagonals win)
+# Each step: condition on the movement signs, direction it shows and faces, offset it sets (None keeps the previous one)
+MOVEMENT_STEPS = [
+    (lambda h, v: v < 0, 'S', (0, -10)),            # Moving down
+    (lambda h, v: v > 0, 'N', None),                # Moving up
+    (lambda h, v: h > 0, 'E', (-30, 0)),            # Moving right
+    (lambda h, v: h < 0, 'W', (-10, 0)),            # Moving left
+    (lambda h, v: h > 0 and v < 0, 'SE', (-40, 10)), # Moving down-right
+    (lambda h, v: h > 0 and v > 0, 'NE', (-40, 10)), # Moving up-right
+    (lambda h, v: h < 0 and v < 0, 'SW', None),     # Moving down-left
+    (lambda h, v: h < 0 and v > 0, 'NW', (0, 10)),  # Moving up-left
+]
+IDLE_FRAMES = {'N': 0, 'NE': 1, 'E': 1, 'SE': 1, 'S': 2, 'SW': 2, 'W': 3, 'NW': 3} # Idle frame per last facing
+IDLE_EAST_OFFSET = (-50, 0)
+MOTIONS = 9 # Sign combinations of the horizontal and vertical movement
+
+
+# Functions
+
+### Index of a movement's sign combination (works on scalars and arrays)
+def motion_code(horizontal, vertical):
+    return (np.sign(horizontal) + 1) * 3 + np.sign(vertical) + 1
+
+### Frame, new facing and offset for one movement, facing and frame
+# A sprite set without a direction falls back to the first east frame, keeping the facing set before the miss
+def resolve_frame(sprites, horizontal, vertical, facing, frame):
+    offset = (0, 0)
+    try:
+        for condition, direction, direction_offset in MOVEMENT_STEPS:
+            if condition(horizontal, vertical):
+                image = sprites[direction][frame]
+                facing = direction
+                offset = direction_offset or offset
+        if horizontal == 0 and vertical == 0:
+            image = sprites['ID'][IDLE_FRAMES[facing]]
+            offset = IDLE_EAST_OFFSET if facing == 'E' else offset
+    except KeyError:
+        image = sprites['E'][0]
+    return image, facing, offset
+
+
+# Precomputed frames of one sprite set, indexed by (motion code, facing id, frame)
+class AnimationTable:
+
+    def __init__(self, sprites, walk_frames):
+        self.images = np.empty((MOTIONS, len(DIRECTIONS), walk_frames), dtype=object)
+        self.facings = np.zeros((MOTIONS, len(DIRECTIONS)), dtype=np.int8)
+        self.offsets = np.zeros((MOTIONS, len(DIRECTIONS), 2), dtype=np.int32)
+        for horizontal in (-1, 0, 1):
+            for vertical in (-1, 0, 1):
+                code = motion_code(horizontal, vertical)
+                for facing in DIRECTIONS:
+                    for frame in range(walk_frames):
+                        image, new_facing, offset = resolve_frame(sprites, horizontal, vertical, facing, frame)
+                        self.images[code, DIRECTION_IDS[facing], frame] = image
+                    self.facings[code, DIRECTION_IDS[facing]] = DIRECTION_IDS[new_facing]
+                    self.offsets[code, DIRECTION_IDS[facing]] = offset
+
+
+# The cat's walk cycle
+class CatAnimation:
+
+    def __init__(self, sprites, walk_frames=CAT_WALK_FRAMES, speed=CAT_ANIMATION_SPEED, facing='N'):
+        self.table = AnimationTable(sprites, walk_frames)
+        self.walk_frames = walk_frames
+        self.speed = speed
+        self.facing = DIRECTION_IDS[facing]
+        self.frame = 0
+        self.frame_count = 0 # Time of the last frame change
+
+    ## Advance to `now` (ms) and return the frame and its draw offset
+    def update(self, now, horizontal, vertical):
+        if now - self.frame_count > self.speed:
+            self.frame_count = now
+            self.frame = (self.frame + 1) % self.walk_frames
+        code = motion_code(horizontal, vertical)
+        facing = self.facing
+        self.facing = int(self.table.facings[code, facing])
+        offset = self.table.offsets[code, facing]
+        return self.table.images[code, facing, self.frame], (int(offset[0]), int(offset[1]))
+
+
+# Walk cycles of every dog at once, from one table per dog type (dogs are drawn without offsets)
+class DogAnimations:
+
+    def __init__(self, sprites, walk_frames=DOG_WALK_FRAMES):
+        tables = [AnimationTable(sprites[dog], walk_frames) for dog in DOG_TYPES]
+        self.images = np.stack([table.images for table in tables]) # (dog type, motion, facing, frame)
+        self.facings = np.stack([table.facings for table in tables])
+        self.walk_frames = walk_frames
+        # Largest frame of each dog type, for culling before frames are picked
+        self.sizes = np.array([[max(image.get_width() for image in table.images.flat), max(image.get_height() for image in table.images.flat)] for table in tables])
+
+    ## Advance every dog's frame counter to `now` (ms) and return the frames of the `rows` (default: all dogs)
+    def update(self, dogs, now, speed, rows=slice(None)):
+        advance = now - dogs.frame_count > speed
+        dogs.frame_count[advance] = now
+        dogs.frame[advance] = (dogs.frame[advance] + 1) % self.walk_frames
+        kind = dogs.kind
+        code = motion_code(dogs.horizontal, dogs.vertical)
+        facing = dogs.facing
+        images = self.images[kind[rows], code[rows], facing[rows], dogs.frame[rows]]
+        facing[:] = self.facings[kind, code, facing]
+        return images
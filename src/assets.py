@@ -0,0 +1,62 @@
+# Imports
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from constants import *
+
+
+# Background asset loader: decodes on a thread pool, finishes on the main thread
+class AssetManager:
+
+    def __init__(self, workers=ASSET_LOADER_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='assets')
+        self.assets = {}
+        self.pending = [] # (name, group, future, finalize), in submission order
+        self.groups = {} # Group -> [loaded, total]
+        self.started = time.perf_counter()
+        self.ready_at = {} # Group -> seconds from start until the group finished loading
+
+    ## Queue an asset: `load` runs on a worker, `finalize` (e.g. convert_alpha) on the main thread in poll()
+    def load(self, name, group, load, finalize=None):
+        self.groups.setdefault(group, [0, 0])[1] += 1
+        self.ready_at.pop(group, None)
+        self.pending.append((name, group, self.pool.submit(load), finalize))
+
+    ## Finalize whatever finished loading; call once per frame from the main thread
+    def poll(self):
+        still_pending = []
+        for name, group, future, finalize in self.pending:
+            if not future.done():
+                still_pending.append((name, group, future, finalize))
+                continue
+            value = future.result() # Re-raises loading errors on the main thread
+            self.assets[name] = finalize(value) if finalize else value
+            self.groups[group][0] += 1
+        self.pending = still_pending
+        for group, (loaded, total) in self.groups.items():
+            if loaded == total and group not in self.ready_at:
+                self.ready_at[group] = time.perf_counter() - self.started
+
+    ## Fraction of a group (or of everything) that has been loaded
+    def progress(self, group=None):
+        counts = [self.groups[group]] if group else self.groups.values()
+        total = sum(count[1] for count in counts)
+        return sum(count[0] for count in counts) / total if total else 1
+
+    ## Whether every asset of a group is loaded
+    def ready(self, group):
+        return group in self.ready_at
+
+    ## Seconds from start until a group was loaded (None while it is still loading)
+    def time_to_ready(self, group):
+        return self.ready_at.get(group)
+
+    def __getitem__(self, name):
+        return self.assets[name]
+
+    def __contains__(self, name):
+        return name in self.assets
+
+    ## Stop the worker threads
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
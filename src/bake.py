@@ -0,0 +1,153 @@
+# Imports
+import os
+import mmap
+import json
+import struct
+import hashlib
+import pygame
+
+from constants import *
+from saves import get_save_path
+
+
+# Cache file layout: magic, header length, JSON header, then raw pixel blobs
+BAKE_MAGIC = b'CDDBAKE1'
+BAKE_HEADER = struct.Struct('<8sI')
+
+
+# Functions
+
+## Paths
+
+### Absolute path of a file in the assets directory
+def asset_path(*parts):
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), 'assets', *parts))
+
+### Source images that go into the baked assets
+def bake_sources():
+    sources = [asset_path('sprites', f'{sprite}.png') for sprite in SPRITE_LIST]
+    sources.append(asset_path('sprites', 'grass.png'))
+    sources += [asset_path('ui', f'{ui_element}.png') for ui_element in UI_SCALES]
+    return sources
+
+
+## Cache key
+
+### Hash of the source images and every table that shapes the baked output
+def bake_key():
+    digest = hashlib.sha256()
+    for source in bake_sources():
+        with open(source, 'rb') as file:
+            digest.update(file.read())
+    tables = (BAKE_VERSION, SPRITE_COORDINATES, SPRITE_LIST, GRASS_COORDINATES, TILE_SIZE, TILE_SCALE, UI_SCALES,
+              WORLD_WIDTH, WORLD_HEIGHT, WORLD_CHUNK_HEIGHT, BORDER_Y, BORDER_HEIGHT,
+              NOISE_OCTAVES, NOISE_LAYERS, NOISE_PERSISTENCE, NOISE_CLUSTER_SIZE, NOISE_SURFACE_SIZE, NOISE_ALPHA)
+    digest.update(repr(tables).encode())
+    return digest.hexdigest()
+
+
+## Writing
+
+### Pack source-size sprite frames, scaled UI elements and the world chunks into the cache file layout (main thread: reads surfaces)
+def pack_bake(key, sprites, ui, world_seed, world_chunks):
+    entries = []
+    blobs = []
+    offset = 0
+
+    def add(name, surface, format):
+        nonlocal offset
+        blob = pygame.image.tobytes(surface, format)
+        entries.append({'name': name, 'size': surface.get_size(), 'format': format, 'offset': offset, 'length': len(blob)})
+        blobs.append(blob)
+        offset += len(blob)
+
+    for sprite, directions in sprites.items():
+        if isinstance(directions, dict):
+            for direction, frames in directions.items():
+                for i, frame in enumerate(frames):
+                    add(f'sprite/{sprite}/{direction}/{i}', frame, 'RGBA')
+        else:
+            for i, frame in enumerate(directions):
+                add(f'tiles/{sprite}/{i}', frame, 'RGBA')
+    for ui_element, surface in ui.items():
+        add(f'ui/{ui_element}', surface, 'RGBA')
+    for index, chunk in world_chunks.items():
+        add(f'world/{index}', chunk, 'RGB')
+
+    header = json.dumps({'key': key, 'world_seed': world_seed, 'entries': entries}).encode()
+    return [BAKE_HEADER.pack(BAKE_MAGIC, len(header)), header] + blobs
+
+### Write a packed cache file atomically (safe to run on a worker thread)
+def write_bake(packed, app_name=GAME_TITLE, file_name=BAKE_FILE_NAME):
+    save_path = get_save_path(app_name)
+    os.makedirs(save_path, exist_ok=True)
+    file_path = os.path.join(save_path, file_name)
+    with open(file_path + '.tmp', 'wb') as file:
+        for blob in packed:
+            file.write(blob)
+    os.replace(file_path + '.tmp', file_path)
+
+### Write sprite frames, scaled UI elements and the world chunks to the cache file
+def save_bake(key, sprites, ui, world_seed, world_chunks, app_name=GAME_TITLE, file_name=BAKE_FILE_NAME):
+    write_bake(pack_bake(key, sprites, ui, world_seed, world_chunks), app_name, file_name)
+
+
+## Reading
+
+### Memory-map the cache file and wrap its blobs as surfaces, or None if it is missing, stale or damaged
+# With convert=False nothing touches the display, so it can run on a worker thread
+def load_bake(key, convert=True, app_name=GAME_TITLE, file_name=BAKE_FILE_NAME):
+    file_path = os.path.join(get_save_path(app_name), file_name)
+    try:
+        with open(file_path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, header_length = BAKE_HEADER.unpack_from(data)
+        if magic != BAKE_MAGIC:
+            return None
+        header = json.loads(data[BAKE_HEADER.size:BAKE_HEADER.size + header_length])
+    except (struct.error, ValueError):
+        return None
+    if header.get('key') != key:
+        return None
+
+    #### A damaged (e.g. truncated) cache is rebaked like a stale one
+    view = memoryview(data)
+    start = BAKE_HEADER.size + header_length
+    sprites, ui, world_chunks = {}, {}, {}
+    try:
+        for entry in header['entries']:
+            end = start + entry['offset'] + entry['length']
+            if end > len(data):
+                return None
+            surface = pygame.image.frombuffer(view[start + entry['offset']:end], entry['size'], entry['format'])
+            kind, *path = entry['name'].split('/')
+            if kind == 'sprite':
+                sprite, direction, _ = path
+                sprites.setdefault(sprite, {}).setdefault(direction, []).append(surface)
+            elif kind == 'tiles':
+                sprites.setdefault(path[0], []).append(surface)
+            elif kind == 'ui':
+                ui[path[0]] = surface
+            elif kind == 'world':
+                world_chunks[int(path[0])] = surface
+        baked = sprites, ui, header['world_seed'], world_chunks
+    except (KeyError, ValueError):
+        return None
+    return convert_bake(baked) if convert else baked
+
+### Convert baked sprites and UI elements to the display format (main thread only)
+# World chunks stay backed by the mapping and are converted when streamed in
+def convert_bake(baked):
+    sprites, ui, world_seed, world_chunks = baked
+    for sprite, directions in sprites.items():
+        if isinstance(directions, dict):
+            for direction, frames in directions.items():
+                directions[direction] = [frame.convert_alpha() for frame in frames]
+        else:
+            sprites[sprite] = [frame.convert_alpha() for frame in directions]
+    for ui_element, surface in ui.items():
+        ui[ui_element] = surface.convert_alpha()
+    return baked
@@ -0,0 +1,203 @@
+# Imports
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+
+from constants import *
+from simulation import Simulation, TUNING, INPUT_UP, INPUT_LEFT, INPUT_RIGHT, EVENT_LEVEL_COMPLETE, random_policy
+
+
+# Batch runs: many headless episodes per difficulty setting, spread over all cores
+BATCH_MAX_TICKS = 20_000 # Longest episode (about 5.5 minutes of game time)
+BATCH_CHUNK_SIZE = 8 # Episodes handed to a worker at a time
+RANDOM_HOLD_TICKS = 10 # Random policy: ticks a key combination is held
+SCRIPTED_LOOKAHEAD = 120 # Scripted policy: how far above the cat a dog counts as in the way
+SCRIPTED_MARGIN = 40 # Scripted policy: horizontal clearance kept from dogs in the way
+TIMEOUT = 'timeout' # Death cause of episodes that hit the tick limit
+RECORD_FIELDS = ['setting', 'seed', 'levels', 'cause', 'ticks', 'level_ticks']
+
+
+# Functions
+
+## Cat policies (separate from the simulation's generators, so they don't shift its spawns)
+
+### Random key combinations, each held for a few ticks
+def held_random_policy(seed):
+    return random_policy(seed, RANDOM_HOLD_TICKS)
+
+### Walk up, stepping sideways away from the closest dog in the way until it has passed
+def scripted_policy(seed):
+    def policy(simulation):
+        simulation.sync_dogs()
+        cat = simulation.cat_rect
+        dogs = simulation.dogs
+        x, y, width, height = dogs.x, dogs.y, dogs.width, dogs.height
+        in_way = (y < cat.bottom) & (y + height > cat.top - SCRIPTED_LOOKAHEAD) & (x < cat.right + SCRIPTED_MARGIN) & (x + width > cat.left - SCRIPTED_MARGIN)
+        if not in_way.any():
+            return INPUT_UP
+        centers = x[in_way] + width[in_way] // 2
+        closest = centers[np.argmin(np.abs(centers - cat.centerx))]
+        return INPUT_RIGHT if closest < cat.centerx else INPUT_LEFT
+    return policy
+
+POLICIES = {
+    'scripted': scripted_policy,
+    'random': held_random_policy,
+}
+
+
+## Episodes
+
+### One headless episode, returned as a compact record (one per RECORD_FIELDS entry)
+def run_episode(job):
+    setting, tuning, policy_name, seed, max_ticks = job
+    simulation = Simulation(seed, first_dog=None, tuning=tuning)
+    policy = POLICIES[policy_name](seed)
+    step = simulation.step
+    level_ticks = []
+    level_started = 0
+    while simulation.tick < max_ticks and not simulation.game_over:
+        if EVENT_LEVEL_COMPLETE in step(policy(simulation)):
+            level_ticks.append(simulation.tick - level_started)
+            level_started = simulation.tick
+    cause = simulation.last_hit_by if simulation.game_over else TIMEOUT
+    return setting, seed, simulation.border_reaches, cause, simulation.tick, level_ticks
+
+### Every combination of the swept values, as tuning dicts for Simulation
+def make_grid(dog_weights, boss_walking, boss_boxing, min_gaps, gap_reductions, speed_caps, dog_paths=DOG_PATHS):
+    grid = []
+    for weights, walking, boxing, min_gap, gap_reduction, speed_cap in itertools.product(dog_weights, boss_walking, boss_boxing, min_gaps, gap_reductions, speed_caps):
+        grid.append({
+            'dog_weights': {dog: weight / sum(weights.values()) for dog, weight in weights.items()},
+            'boss_weight_increments': {'boss_walking': walking, 'boss_boxing': boxing},
+            'min_gap': min_gap,
+            'gap_reduction': gap_reduction,
+            'dog_speed_cap': speed_cap,
+            'dog_paths': dog_paths,
+        })
+    return grid
+
+### Run `episodes` seeds of every setting on a process pool, yielding records as they finish
+# Every setting plays the same seeds, so settings are compared on the same spawns where they agree
+def run_batch(grid, episodes, policy='scripted', first_seed=0, max_ticks=BATCH_MAX_TICKS, workers=None):
+    jobs = [(setting, tuning, policy, first_seed + episode, max_ticks) for setting, tuning in enumerate(grid) for episode in range(episodes)]
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(run_episode, jobs, chunksize=BATCH_CHUNK_SIZE)
+
+
+## Aggregation
+
+### Per setting: distribution of levels reached, death causes, and time spent per level
+class BatchSummary:
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.levels = [{} for _ in grid] # Levels reached -> episodes
+        self.causes = [{} for _ in grid] # Dog type (or timeout) -> episodes
+        self.level_ticks = [[] for _ in grid] # Per level, ticks every episode that cleared it took
+        self.episodes = [0] * len(grid)
+        self.ticks = 0
+
+    def add(self, record):
+        setting, seed, levels, cause, ticks, level_ticks = record
+        self.levels[setting][levels] = self.levels[setting].get(levels, 0) + 1
+        self.causes[setting][cause] = self.causes[setting].get(cause, 0) + 1
+        per_level = self.level_ticks[setting]
+        for level, duration in enumerate(level_ticks):
+            if level == len(per_level):
+                per_level.append([])
+            per_level[level].append(duration)
+        self.episodes[setting] += 1
+        self.ticks += ticks
+
+    ## Mean and percentiles of the levels reached
+    def level_stats(self, setting):
+        levels = np.repeat(list(self.levels[setting]), list(self.levels[setting].values()))
+        p10, p50, p90 = np.percentile(levels, (10, 50, 90))
+        return {'mean': levels.mean(), 'p10': p10, 'p50': p50, 'p90': p90, 'max': int(levels.max())}
+
+    ## Mean seconds of game time per cleared level
+    def seconds_per_level(self, setting):
+        return [float(np.mean(durations)) * TICK_MS / 1000 for durations in self.level_ticks[setting]]
+
+    def to_dict(self):
+        return {
+            'ticks': self.ticks,
+            'settings': [{
+                'tuning': tuning,
+                'episodes': self.episodes[setting],
+                'levels': self.level_stats(setting),
+                'level_distribution': dict(sorted(self.levels[setting].items())),
+                'death_causes': dict(sorted(self.causes[setting].items(), key=lambda item: -item[1])),
+                'seconds_per_level': self.seconds_per_level(setting),
+            } for setting, tuning in enumerate(self.grid) if self.episodes[setting]],
+        }
+
+
+### Comma-separated values for a grid axis
+def parse_values(kind):
+    return lambda text: [kind(value) for value in text.split(',')]
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description=f"Sweep {GAME_TITLE} difficulty settings over many headless episodes")
+    parser.add_argument('--episodes', type=int, default=100, help="Episodes per setting")
+    parser.add_argument('--policy', choices=POLICIES, default='scripted', help="Cat policy (default: scripted)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first episode, the others count up from it")
+    parser.add_argument('--ticks', type=int, default=BATCH_MAX_TICKS, help="Most ticks per episode")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--dog-weights', metavar='FILE', help="JSON list of dog weight dicts to sweep (default: DOG_BASE_WEIGHTS)")
+    parser.add_argument('--boss-walking', type=parse_values(float), default=[BOSS_WEIGHT_INCREMENTS['boss_walking']], help="Walking boss weight added per dog, comma-separated")
+    parser.add_argument('--boss-boxing', type=parse_values(float), default=[BOSS_WEIGHT_INCREMENTS['boss_boxing']], help="Boxing boss weight added per dog, comma-separated")
+    parser.add_argument('--min-gap', type=parse_values(int), default=[MIN_GAP], help="MIN_GAP values, comma-separated")
+    parser.add_argument('--gap-reduction', type=parse_values(int), default=[GAP_REDUCTION_FACTOR], help="GAP_REDUCTION_FACTOR values, comma-separated")
+    parser.add_argument('--speed-cap', type=parse_values(float), default=[DOG_SPEED_CAP], help="DOG_SPEED_CAP values, comma-separated")
+    parser.add_argument('--dog-paths', action=argparse.BooleanOptionalAction, default=DOG_PATHS, help="Dogs on closed-form paths with swept collision")
+    parser.add_argument('--records', metavar='FILE', help="Write every episode record to a CSV file")
+    parser.add_argument('--output', metavar='FILE', help="Write the aggregated results to a JSON file")
+    args = parser.parse_args()
+
+    dog_weights = [TUNING['dog_weights']]
+    if args.dog_weights:
+        with open(args.dog_weights) as file:
+            dog_weights = json.load(file)
+    grid = make_grid(dog_weights, args.boss_walking, args.boss_boxing, args.min_gap, args.gap_reduction, args.speed_cap, args.dog_paths)
+    summary = BatchSummary(grid)
+    records_file = open(args.records, 'w', newline='') if args.records else None
+    writer = csv.writer(records_file) if records_file else None
+    if writer:
+        writer.writerow(RECORD_FIELDS)
+
+    total = len(grid) * args.episodes
+    start = time.perf_counter()
+    for done, record in enumerate(run_batch(grid, args.episodes, args.policy, args.seed, args.ticks, args.workers), 1):
+        summary.add(record)
+        if writer:
+            writer.writerow(record[:5] + (' '.join(map(str, record[5])),))
+        if done % max(1, total // 20) == 0 or done == total:
+            print(f"\r{done}/{total} episodes", end='', file=sys.stderr, flush=True)
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    if records_file:
+        records_file.close()
+
+    print(f"{total} episodes, {summary.ticks} ticks in {elapsed:.1f}s ({summary.ticks / elapsed:.0f} ticks/s)")
+    print(f"{'#':>3} {'gap':>4} {'red':>4} {'cap':>5} {'walk':>5} {'box':>5} {'mean':>6} {'p50':>5} {'p90':>5} {'max':>4}  {'s/level (first 5)':<28} top causes")
+    for setting, tuning in enumerate(grid):
+        levels = summary.level_stats(setting)
+        seconds = ' '.join(f"{value:.1f}" for value in summary.seconds_per_level(setting)[:5])
+        causes = ', '.join(f"{cause} {count}" for cause, count in sorted(summary.causes[setting].items(), key=lambda item: -item[1])[:3])
+        increments = tuning['boss_weight_increments']
+        print(f"{setting:>3} {tuning['min_gap']:>4} {tuning['gap_reduction']:>4} {tuning['dog_speed_cap']:>5g} {increments['boss_walking']:>5g} {increments['boss_boxing']:>5g} "
+              f"{levels['mean']:>6.2f} {levels['p50']:>5g} {levels['p90']:>5g} {levels['max']:>4}  {seconds:<28} {causes}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(summary.to_dict(), file, indent=2)
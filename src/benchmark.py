@@ -0,0 +1,340 @@
+# Imports
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import numpy as np
+import pygame
+
+from constants import *
+from dogs import DogTable
+from collision import CollisionIndex
+from paths import DogPaths
+from simulation import Simulation, random_policy
+from saves import get_save_path, save_game_data, load_game_data, SaveStore
+from world import World
+from animation import CatAnimation, DogAnimations
+from spritebatch import SpriteBatch
+from sprites import get_sprite, cut_sprites, build_sprites, shrink_sprites, generate_masks
+from bake import asset_path, bake_key, save_bake, load_bake
+
+
+# Benchmarks write their cache and save files under their own app name, never the player's
+BENCHMARK_APP = f"{GAME_TITLE} benchmark"
+DOG_COUNTS = (1, 10, 100, 1000, 10000)
+
+
+# Functions
+
+## Helpers
+
+### Average wall time per call in microseconds
+def time_per_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+### Wall time of a single call in milliseconds
+def time_once(function):
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start) * 1000, result
+
+### Fewer repeats for bigger dog counts, so each measurement takes about the same time
+def repeats_for(count, budget=20000, most=200, least=5):
+    return max(least, min(most, budget // count))
+
+### Dog table with dogs scattered over the spawn band
+def make_dogs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    dogs = DogTable()
+    for x, y in zip(rng.integers(0, WORLD_WIDTH, count), rng.integers(VIEWPORT_BUFFER, DOG_START_Y, count)):
+        dogs.add('dog_white', (int(x), int(y)), (125, 110))
+    return dogs
+
+### Simulation with `count` dogs in the spawn band and a cat that cannot die (optionally with dogs on paths)
+def make_simulation(count, seed=0, dog_paths=False):
+    simulation = Simulation(seed=seed, tuning={'dog_paths': dog_paths})
+    simulation.dogs = make_dogs(count, seed)
+    if dog_paths:
+        simulation.paths = DogPaths()
+        simulation.paths.add(simulation.dogs, np.arange(count), np.full(count, DOG_SPEED_X))
+    simulation.health = 10**9
+    return simulation
+
+### Window plus the main module's drawing globals, as the game sets them up
+def setup_display():
+    import main
+    from textcache import TextCache
+    from clips import ClipCache
+    from transitions import Transitions
+    from profiler import FrameProfiler
+    main.game_window = pygame.display.get_surface() or pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    main.canvas = None
+    main.font = pygame.font.Font(asset_path('ui', 'pico-8.otf'), 24)
+    main.text_cache = TextCache(asset_path('ui', 'pico-8.otf'), 24, main.font)
+    main.clips = ClipCache(main.text_cache)
+    main.transitions = Transitions()
+    main.profiler = FrameProfiler(enabled=False)
+    main.ui = {}
+    return main
+
+
+## Startup
+
+### Loading the source images, cutting the sprites, generating the world, and writing and reading the bake cache
+def benchmark_startup():
+    setup_display()
+    results = {}
+    results['startup.load_images_ms'], (sheets, images) = time_once(lambda: (
+        {sheet: pygame.image.load(asset_path('sprites', f'{sheet}.png')) for sheet in SPRITE_LIST + ['grass']},
+        {ui_element: pygame.image.load(asset_path('ui', f'{ui_element}.png')) for ui_element in UI_LIST}))
+
+    def cut():
+        frames = {sprite: cut_sprites(sheets[sprite].convert_alpha(), SPRITE_COORDINATES[sprite]) for sprite in SPRITE_LIST}
+        frames['grass'] = [get_sprite(sheets['grass'].convert(), *coord, None, None) for coord in GRASS_COORDINATES]
+        return frames
+    results['startup.cut_sprites_ms'], frames = time_once(cut)
+    results['startup.generate_sprites_ms'], sprites = time_once(lambda: build_sprites(frames))
+    results['startup.generate_masks_ms'], _ = time_once(lambda: {sprite: generate_masks(sprites[sprite]) for sprite in SPRITE_LIST})
+
+    world = World([sprites['grass']], seed=0)
+    results['startup.generate_world_ms'], chunks = time_once(world.generate_all)
+    results['startup.generate_chunk_ms'] = results['startup.generate_world_ms'] / len(chunks)
+
+    ui = {ui_element: images[ui_element].convert_alpha() for ui_element in UI_SCALES}
+    for ui_element, scale in UI_SCALES.items():
+        ui[ui_element] = pygame.transform.scale(ui[ui_element], (int(ui[ui_element].get_width() * scale), int(ui[ui_element].get_height() * scale)))
+    results['startup.bake_key_ms'], key = time_once(bake_key)
+    results['startup.write_bake_ms'], _ = time_once(lambda: save_bake(key, frames, ui, world.seed, chunks, app_name=BENCHMARK_APP))
+    results['startup.load_bake_ms'], baked = time_once(lambda: load_bake(key, app_name=BENCHMARK_APP))
+    assert baked is not None
+    return results
+
+
+## Steady state
+
+### Simulation ticks (cat, dog movement, collisions) per dog count, with per-tick movement and with dogs on paths
+def benchmark_ticks(counts=DOG_COUNTS):
+    results = {}
+    for dog_paths, name in ((False, 'tick'), (True, 'tick.paths')):
+        for count in counts:
+            simulation = make_simulation(count, dog_paths=dog_paths)
+            policy = random_policy(0)
+            step = lambda: simulation.step(policy(simulation))
+            for _ in range(10):
+                step()
+            results[f'{name}.{count}_dogs_us'] = time_per_call(step, repeats_for(count))
+    return results
+
+### Animation and drawing a frame (world, characters in view, HUD) per dog count, without presenting it
+# With `canvas`, the world and characters are drawn into the pixel canvas and scaled up (results under render.canvas)
+def benchmark_render(counts=DOG_COUNTS, canvas=False):
+    main = setup_display()
+    sprites, ui_elements, world = load_graphics()
+    main.ui.update(ui_elements)
+    hud = main.make_hud()
+    name = 'render'
+    scale = 1
+    if canvas:
+        name, scale = 'render.canvas', PIXEL_CANVAS_SCALE
+        main.canvas = pygame.Surface((WINDOW_WIDTH // scale, WINDOW_HEIGHT // scale)).convert()
+        sprites = {sprite: shrink_sprites(sprites[sprite], scale) for sprite in SPRITE_LIST}
+        world = World(world.texture_sets, world.seed, baked=world.baked, scale=scale)
+    cat_animation = CatAnimation(sprites['cat_grey'])
+    dog_animations = DogAnimations(sprites)
+    batch = SpriteBatch(scale=scale)
+    results = {}
+    for count in counts:
+        simulation = make_simulation(count)
+        simulation.viewport_y = DOG_START_Y - WINDOW_HEIGHT // 2 # Half the spawn band in view
+
+        def frame():
+            main.batch_characters(batch, simulation, cat_animation, dog_animations, pygame.time.get_ticks())
+            hud.update(counter=simulation.border_reaches, progress=main.progress_filled(simulation.viewport_y), hearts=DEFAULT_HEALTH)
+            main.draw_scene(world, simulation, batch, hud)
+
+        frame()
+        results[f'{name}.{count}_dogs_us'] = time_per_call(frame, repeats_for(count, budget=5000, least=3))
+    return results
+
+### Sprites, UI elements and a world, the way the game loads them from the bake cache (baked first if needed)
+def load_graphics():
+    key = bake_key()
+    baked = load_bake(key, app_name=BENCHMARK_APP)
+    if baked is None:
+        benchmark_startup()
+        baked = load_bake(key, app_name=BENCHMARK_APP)
+    frames, ui_elements, world_seed, world_chunks = baked
+    ui_elements.update({ui_element: pygame.image.load(asset_path('ui', f'{ui_element}.png')).convert_alpha() for ui_element in UI_LIST if ui_element not in UI_SCALES})
+    sprites = build_sprites(frames)
+    return sprites, ui_elements, World([sprites['grass']], world_seed, baked=world_chunks)
+
+### Effect frames: the pulsing arrow, the end screen fade and the growing 'YOU DIED', played from cached clips
+# The 'YOU DIED' growth is also timed scaling the text every frame, the way it was drawn before the clips
+def benchmark_effects(repeats=200):
+    from transitions import Tween, Layer, ClipLayer
+    main = setup_display()
+    window = main.game_window
+    results = {}
+    results['effects.arrow_us'] = time_per_call(lambda: main.draw_arrow(DOG_START_Y, 96, (200, 200, 150)), repeats)
+
+    main.transitions.effects = []
+    main.draw_end_screen(SPECIAL_SCORE, 0)
+    end_screen = main.transitions.effects.pop()
+    end_screen.elapsed = end_screen.duration // 2
+    results['effects.end_screen_us'] = time_per_call(lambda: end_screen.draw(window), repeats)
+
+    center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+    grow = Tween(0.1, 1, repeats)
+    layers = {
+        'clip': ClipLayer(main.clips.scaled_text("YOU DIED", (255, 0, 0), 0.1, 1), center, grow),
+        'scaled': Layer(main.text_cache.render("YOU DIED", (255, 0, 0)), center, scale=grow),
+    }
+    for name, layer in layers.items():
+        elapsed = iter(range(repeats))
+        results[f'effects.you_died_{name}_us'] = time_per_call(lambda: layer.draw(window, next(elapsed)), repeats)
+    return results
+
+
+## Collision
+
+### Cat-vs-dog hits per tick: linear scale_by scan vs the broadphase index
+def benchmark_collision(counts=(10, 100, 1000, 10000), repeats=200):
+    cat_hitbox = pygame.Rect(WINDOW_WIDTH // 2, CAT_START_Y - 1000, 55, 120).scale_by(CAT_HITBOX_SCALE_X, CAT_HITBOX_SCALE_Y)
+    rng = np.random.default_rng(0)
+    results = {}
+    for count in counts:
+        dogs = make_dogs(count)
+        index = CollisionIndex()
+
+        def move():
+            dogs.move(5, rng)
+
+        def scan():
+            return [i for i in range(len(dogs)) if cat_hitbox.colliderect(dogs.rect(i).scale_by(DOG_HITBOX_SCALE_X, DOG_HITBOX_SCALE_Y))]
+
+        def lookup():
+            index.update(dogs)
+            return list(index.query(cat_hitbox))
+
+        def linear():
+            move()
+            scan()
+
+        def indexed():
+            move()
+            lookup()
+
+        # Both must report the same hits before timing them
+        for _ in range(10):
+            move()
+            assert scan() == lookup()
+        baseline = time_per_call(move, repeats)
+        results[f'collision.linear.{count}_dogs_us'] = time_per_call(linear, repeats) - baseline
+        results[f'collision.indexed.{count}_dogs_us'] = time_per_call(indexed, repeats) - baseline
+    return results
+
+
+## Saves
+
+### Writing and reading the save file, and a burst of high scores through the save store
+def benchmark_saves(repeats=50):
+    data = {'highscore': 12}
+    results = {
+        'saves.write_us': time_per_call(lambda: save_game_data(data, BENCHMARK_APP), repeats),
+        'saves.read_us': time_per_call(lambda: load_game_data(BENCHMARK_APP), repeats),
+    }
+    store = SaveStore(BENCHMARK_APP, flush_delay=0)
+    results['saves.store_write_us'] = time_per_call(lambda: store.write_high_score(13), repeats)
+    results['saves.store_flush_us'] = time_per_call(lambda: (store.update({'highscore': 14}), store.flush()), repeats)
+    store.close()
+    return results
+
+
+## Running and comparing
+
+BENCHMARKS = {
+    'startup': benchmark_startup,
+    'tick': benchmark_ticks,
+    'render': benchmark_render,
+    'canvas': lambda: benchmark_render(canvas=True),
+    'effects': benchmark_effects,
+    'collision': benchmark_collision,
+    'saves': benchmark_saves,
+}
+
+### Run the selected benchmarks; every result is a time, so lower is better
+def run_benchmarks(names=BENCHMARKS):
+    pygame.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    results = {}
+    try:
+        for name in names:
+            results.update(BENCHMARKS[name]())
+    finally:
+        shutil.rmtree(get_save_path(BENCHMARK_APP), ignore_errors=True)
+    return results
+
+### Results with what they ran on, as stored in a baseline file
+def make_baseline(results):
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+### Results that got slower than the baseline by more than `threshold` (0.2 = 20%)
+def find_regressions(results, baseline, threshold):
+    regressions = {}
+    for name, value in results.items():
+        before = baseline.get(name)
+        if before and value > before * (1 + threshold):
+            regressions[name] = (before, value)
+    return regressions
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description=f"{GAME_TITLE} benchmarks")
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--save', metavar='FILE', help="Write the results to a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="Compare against a JSON baseline and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown before a result counts as a regression (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = run_benchmarks(args.benchmarks or BENCHMARKS)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    print(f"{'benchmark':<36} {'time':>12} {'baseline':>12} {'change':>8}")
+    for name, value in results.items():
+        before = baseline.get(name)
+        before_text = f"{before:.1f}" if before else ''
+        change = f"{(value / before - 1) * 100:+.0f}%" if before else ''
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:<36} {value:>12.1f} {before_text:>12} {change:>8}{flag}")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(make_baseline(results), file, indent=2)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
@@ -0,0 +1,83 @@
+# Imports
+import pygame
+
+from constants import *
+from surfaces import display_format
+
+
+# Functions
+
+### Points of the 'UP' arrow in a size x size box
+def arrow_points(size):
+    return [
+        (size // 2, 0),             # Top point
+        (size, size),               # Bottom right
+        (size // 2, size * 2 // 3), # Middle
+        (0, size)                   # Bottom left
+    ]
+
+
+# A surface pre-rendered at evenly spaced scales from `start` to `end`, looked up by scale instead of scaled per frame
+class ScaleClip:
+
+    def __init__(self, surface, start, end, frames=CLIP_SCALE_FRAMES):
+        self.start = start
+        self.end = end
+        width, height = surface.get_size()
+        scales = [start + (end - start) * i / (frames - 1) for i in range(frames)]
+        self.frames = [display_format(pygame.transform.scale(surface, (int(width * scale), int(height * scale))), alpha=True) for scale in scales]
+
+    ## Frame closest to `scale`
+    def frame(self, scale):
+        t = (scale - self.start) / (self.end - self.start)
+        return self.frames[min(max(round(t * (len(self.frames) - 1)), 0), len(self.frames) - 1)]
+
+
+# Pre-rendered effect surfaces (arrow, end screen texts, growing titles), built on first use and kept across runs
+# Fading effects share one surface and only change its alpha per frame
+class ClipCache:
+
+    def __init__(self, text_cache):
+        self.text_cache = text_cache
+        self.clips = {}
+        self.hits = 0
+        self.misses = 0
+
+    ## Clip for `key`, built by `build` the first time it is asked for
+    def get(self, key, build):
+        clip = self.clips.get(key)
+        if clip is not None:
+            self.hits += 1
+            return clip
+        self.misses += 1
+        clip = self.clips[key] = build()
+        return clip
+
+    ## The 'UP' arrow at full opacity (blit it with a surface alpha to pulse it)
+    def arrow(self, size, color):
+        def build():
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.polygon(surface, tuple(color[:3]) + (255,), arrow_points(size))
+            return display_format(surface, alpha=True)
+        return self.get(('arrow', size, tuple(color)), build)
+
+    ## Lines of text, each centered `offset` pixels below `center`, composited into one surface and its screen rect
+    # lines: (text, color, offset) tuples
+    def text_block(self, lines, center):
+        lines = tuple((text, tuple(color), offset) for text, color, offset in lines)
+        def build():
+            surfaces = [self.text_cache.render(text, color) for text, color, _ in lines]
+            rects = [surface.get_rect(center=(center[0], center[1] + offset)) for surface, (_, _, offset) in zip(surfaces, lines)]
+            area = rects[0].unionall(rects[1:])
+            block = pygame.Surface(area.size, pygame.SRCALPHA)
+            for surface, rect in zip(surfaces, rects):
+                block.blit(surface, rect.move(-area.x, -area.y))
+            return display_format(block, alpha=True), area
+        return self.get(('text_block', lines, tuple(center)), build)
+
+    ## Text growing (or shrinking) from `start` to `end` times its size
+    def scaled_text(self, text, color, start, end, frames=CLIP_SCALE_FRAMES):
+        return self.get(('scaled_text', text, tuple(color), start, end, frames), lambda: ScaleClip(self.text_cache.render(text, color), start, end, frames))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.clips)}
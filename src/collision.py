@@ -0,0 +1,140 @@
+# Imports
+import numpy as np
+import pygame
+
+from constants import *
+from dogs import DOG_TYPES, DOG_TYPE_IDS
+from animation import resolve_frame
+
+
+# Functions
+
+### Scale spans along one axis around their centers, using the same single-precision math as pygame.Rect.scale_by
+def scale_spans(position, size, scale):
+    scale = np.float32(scale)
+    scaled_position = np.trunc((position + size // 2).astype(np.float32) - size.astype(np.float32) * scale / np.float32(2))
+    scaled_size = np.trunc(size.astype(np.float32) * scale)
+    return scaled_position.astype(np.int32), scaled_size.astype(np.int32)
+
+### Vectorized pygame.Rect.scale_by
+def scale_rects(x, y, width, height, scale_x, scale_y):
+    scaled_x, scaled_width = scale_spans(x, width, scale_x)
+    scaled_y, scaled_height = scale_spans(y, height, scale_y)
+    return scaled_x, scaled_y, scaled_width, scaled_height
+
+### Vectorized pygame.Rect.colliderect of one rect against many
+def collide_rects(rect, x, y, width, height):
+    if rect.width == 0 or rect.height == 0:
+        return np.zeros(len(x), bool)
+    return (rect.x < x + width) & (rect.y < y + height) & (rect.right > x) & (rect.bottom > y) & (width > 0) & (height > 0)
+
+## Pixel-accurate hits
+
+### Union of a set of frames' masks
+def union_mask(frames):
+    union = pygame.mask.Mask((max(frame.get_size()[0] for frame in frames), max(frame.get_size()[1] for frame in frames)))
+    for frame in frames:
+        union.draw(frame, (0, 0))
+    return union
+
+### Masks the simulation tests against: per dog type and walking direction, and the cat's per direction
+# Walk frames advance on the wall clock, so a mask covers every frame of its direction; the cat's are laid
+# out like its sprites (one mask per walk direction, every standing frame), for picking with resolve_frame
+# 'sizes' holds the largest mask of each dog type, since dogs are drawn with frames larger than their rects
+def collision_masks(masks):
+    cat = masks['cat_grey']
+    collision_masks = {'cat': {direction: frames if direction == 'ID' else [union_mask(frames)] for direction, frames in cat.items()}}
+    for dog in DOG_TYPES:
+        for direction in ('E', 'W'):
+            collision_masks[DOG_TYPE_IDS[dog], direction] = union_mask(masks[dog][direction])
+    collision_masks['sizes'] = np.array([np.max([collision_masks[DOG_TYPE_IDS[dog], direction].get_size() for direction in ('E', 'W')], axis=0) for dog in DOG_TYPES])
+    return collision_masks
+
+### The cat's mask, its new facing and where it is drawn relative to its rect, picked like its animation frame
+def cat_pixels(collision_masks, horizontal, vertical, facing):
+    return resolve_frame(collision_masks['cat'], horizontal, vertical, facing, 0)
+
+### Whether a dog's pixels touch the cat's mask drawn at `cat_position` (dogs moving vertically show their first east frame)
+def pixels_overlap(collision_masks, dogs, i, cat_mask, cat_position):
+    direction = 'E' if dogs.horizontal[i] > 0 or dogs.vertical[i] != 0 else 'W'
+    mask = collision_masks[dogs.kind[i], direction]
+    return mask.overlap(cat_mask, (cat_position[0] - int(dogs.x[i]), cat_position[1] - int(dogs.y[i]))) is not None
+
+
+# Broadphase collision index for dog hitboxes
+class CollisionIndex:
+
+    def __init__(self):
+        self.dogs = None
+        self.refreshed = 0 # Hitboxes recomputed since creation
+        self.resorts = 0 # Lane index rebuilds since creation
+
+    ## Rebuild everything for a new or resized dog table
+    def _rebuild(self, dogs):
+        self.dogs = dogs
+        self.count = len(dogs)
+        self.x = dogs.x.copy()
+        self.y = dogs.y.copy()
+        self.hx, self.hy, self.hw, self.hh = scale_rects(dogs.x, dogs.y, dogs.width, dogs.height, DOG_HITBOX_SCALE_X, DOG_HITBOX_SCALE_Y)
+        self.max_height = int(self.hh.max()) if self.count else 0
+        # How far a dog's rect reaches past its hitbox, at most
+        self.margin_x = int((dogs.width - self.hw).max()) // 2 + 1 if self.count else 0
+        self.margin_y = int((dogs.height - self.hh).max()) // 2 + 1 if self.count else 0
+        self.refreshed += self.count
+        self._sort_lanes()
+
+    ## Lane index: dog rows sorted by the top of their hitbox
+    def _sort_lanes(self):
+        self.order = np.argsort(self.hy, kind='stable')
+        self.lane_tops = self.hy[self.order]
+        self.resorts += 1
+
+    ## Refresh the hitboxes of the dogs that moved since the last update
+    def update(self, dogs):
+        if dogs is not self.dogs or len(dogs) != self.count:
+            self._rebuild(dogs)
+            return
+        moved_x = self.x != dogs.x
+        moved_y = self.y != dogs.y
+        walked = np.count_nonzero(moved_x)
+        if walked == self.count:
+            # Everyone walked this tick: refresh the whole column at once
+            self.x[:] = dogs.x
+            self.hx[:], _ = scale_spans(dogs.x, dogs.width, DOG_HITBOX_SCALE_X)
+        elif walked:
+            self.x[moved_x] = dogs.x[moved_x]
+            self.hx[moved_x], _ = scale_spans(dogs.x[moved_x], dogs.width[moved_x], DOG_HITBOX_SCALE_X)
+        if moved_y.any():
+            self.y[moved_y] = dogs.y[moved_y]
+            self.hy[moved_y], _ = scale_spans(dogs.y[moved_y], dogs.height[moved_y], DOG_HITBOX_SCALE_Y)
+            self._sort_lanes()
+            walked = np.count_nonzero(moved_x | moved_y)
+        self.refreshed += walked
+
+    ## Rows whose whole rect (not only its hitbox) overlaps the given rect, in row order
+    # With `sizes` (per dog type), a dog covers its rect or a frame of that size at its position, whichever is larger
+    def query_sprites(self, rect, sizes=None):
+        if self.count == 0:
+            return self.order
+        dogs = self.dogs
+        margin_x, margin_y = self.margin_x, self.margin_y
+        if sizes is not None:
+            # A hitbox lies within its sprite, so it is at most a sprite size away from anything the sprite touches
+            margin_x, margin_y = max(margin_x, int(sizes[:, 0].max())), max(margin_y, int(sizes[:, 1].max()))
+        candidates = self.query(rect.inflate(2 * margin_x, 2 * margin_y))
+        width, height = dogs.width[candidates], dogs.height[candidates]
+        if sizes is not None:
+            kinds = dogs.kind[candidates]
+            width, height = np.maximum(width, sizes[kinds, 0]), np.maximum(height, sizes[kinds, 1])
+        return candidates[collide_rects(rect, dogs.x[candidates], dogs.y[candidates], width, height)]
+
+    ## Rows whose hitbox overlaps the given rect, in row order
+    def query(self, rect):
+        if self.count == 0:
+            return self.order
+        # Only lanes whose hitbox top lies in [rect.top - tallest hitbox, rect.bottom) can overlap
+        first = np.searchsorted(self.lane_tops, rect.top - self.max_height, 'right')
+        last = np.searchsorted(self.lane_tops, rect.bottom, 'left')
+        candidates = self.order[first:last]
+        hits = candidates[collide_rects(rect, self.hx[candidates], self.hy[candidates], self.hw[candidates], self.hh[candidates])]
+        return np.sort(hits)
@@ -5,7 +5,19 @@ GAME_TITLE = "Cats Dodge Dogs"
 
 ## Game state
 SAVE_FILE_NAME = f"{GAME_TITLE.replace(' ', '_')}.json"
+SAVE_FLUSH_DELAY = 0.5 # Seconds the save store waits to batch changes before writing
+BAKE_FILE_NAME = f"{GAME_TITLE.replace(' ', '_')}.cache"
+BAKE_VERSION = 2 # Bump to invalidate baked caches when the bake format changes
+ASSET_LOADER_WORKERS = 4 # Threads decoding assets in the background
+TEXT_CACHE_SIZE = 128 # Rendered text surfaces kept in memory
+TEXT_FADE_STEP = 8 # Color step of fading text, so each shade is rendered once
 DEBUG = False
+DIRTY_RECTS = False # Redraw and push only the parts of the window that changed (full redraws while scrolling)
+PROFILE = False # Time each phase of the game loop (always on with DEBUG, which also shows the overlay)
+PROFILE_HISTORY = 600 # Frames kept for the percentiles
+PROFILE_OVERLAY_INTERVAL = 500 # Milliseconds between overlay refreshes
+PROFILE_FILE_NAME = "profile" # Written as .json (summary) and .csv (samples) next to the save file on exit
+REPLAY_FILE_NAME = "last_run.replay" # Input log of the last run, in the save directory
 
 ## Game mechanics
 SPECIAL_SCORE = 10
@@ -16,6 +28,7 @@ CAT_HITBOX_SCALE_X = 1
 CAT_HITBOX_SCALE_Y = 0.9
 DOG_HITBOX_SCALE_X = 0.8
 DOG_HITBOX_SCALE_Y = 0.6
+PIXEL_COLLISION = False # Sprite pixels instead of the scaled hitboxes decide hits (tested only once the drawn sprite areas overlap)
 
 ### Dimensions
 WINDOW_WIDTH = 800
@@ -25,7 +38,6 @@ WINDOW_HEIGHT = 1080
 MIN_GAP = 100  # Minimum gap between dogs
 GAP_REDUCTION_FACTOR = 10  # How much the gap reduces per border reach
 VIEWPORT_BUFFER = 600
-MAX_SPAWN_TRIES = 100
 
 
 ## Movement
@@ -42,6 +54,16 @@ CAT_ANIMATION_SPEED = 60
 DOG_ANIMATION_SPEED = 45
 FPS = 60
 
+## Simulation
+TICK_MS = 1000 / FPS # Simulated time per tick
+MAX_TICKS_PER_FRAME = 5 # Upper bound on catch-up ticks after a slow frame
+DOG_PATHS = False # Dogs walk fixed-speed paths predicted in closed form, hit-tested along the whole tick (swept)
+
+## Effects
+FLASH_DURATION = 120 # Milliseconds the red flash lasts after a hit
+FLASH_ALPHA = 96 # Peak opacity of the hit flash
+CLIP_SCALE_FRAMES = 100 # Frames pre-rendered for a growing text (e.g. 'YOU DIED')
+
 ## Sprites
 
 ### Cat
@@ -66,6 +88,7 @@ GREY_CAT_COORDINATES = {
 ### Dogs
 DOG_BASE_WEIGHTS = {'dog_white': 3, 'dog_bw': 3, 'dog_black': 2, 'dog_brown': 4, 'dog_exotic': 2, 'boss_walking': 0.25, 'boss_boxing': 0.125}
 DOG_BASE_WEIGHTS = {k: v / sum(DOG_BASE_WEIGHTS.values()) for k, v in DOG_BASE_WEIGHTS.items()}
+BOSS_WEIGHT_INCREMENTS = {'boss_walking': 0.1, 'boss_boxing': 0.05} # Added to a boss's weight per dog already in the level
 
 #### Regular Dog
 DOG_WALK_FRAMES = 7
@@ -93,6 +116,8 @@ PLANT_COORDINATES = [(x, 32, 32, 32) for x in range(0, 161, 32)]
 
 ### UI
 START_BUTTON_COORDINATES = (240, 951, 318, 98)
+PROGRESS_BAR_LENGTH = 225 # Total length of the progress bar
+PROGRESS_BAR_STEP = 9 # The bar fills in steps of this many pixels, so the HUD is rebuilt a few times a second while climbing instead of every frame (divides PROGRESS_BAR_LENGTH)
 
 ### Wrapping
 SPRITE_COORDINATES = {
@@ -130,6 +155,7 @@ SPRITE_SCALES = [
 SPRITE_LIST = ['cat_grey', 'dog_white', 'dog_bw', 'dog_black', 'dog_brown', 'dog_exotic', 'boss_walking', 'boss_boxing',]
 DOUBLE_DAMAGE_DOGS = ['boss_walking', 'boss_boxing',]
 UI_LIST = ['screen_start_normal', 'screen_start_special', 'overlay_horizon', 'heart', 'heart_bg', 'heart_border', 'screen_keybinds'] # 'overlay_arrow']
+UI_SCALES = {'heart': 2, 'heart_bg': 2, 'heart_border': 2}
 SOUNDS = {'you-died': 0.5, 'cat-hurt-light': 0.5, 'cat-hurt-hard': 0.5, 'level-complete': 0.25, 'cat-heal': 0.5}
 
 
@@ -144,8 +170,24 @@ WORLD_HEIGHT = WINDOW_HEIGHT * LEVEL_HEIGHT
 BORDER_HEIGHT = TILE_SIZE  # Height of the border area
 BORDER_Y = 0  # Y position of the border (at the top of the world)
 
+### Streaming
+WORLD_CHUNK_HEIGHT = TILE_SIZE * 9  # At least a window tall, so at most two chunks are ever visible
+WORLD_CHUNK_CACHE = 4  # Chunks kept in memory (visible ones plus one above and below)
+
+### Pixel canvas
+PIXEL_CANVAS = False # Draw the world and characters into a small canvas near source resolution, upscaled to the window once per frame (HUD and effects stay full resolution)
+PIXEL_CANVAS_SCALE = TILE_SCALE # Window pixels per canvas pixel: tiles keep their source pixels, and it divides the window, chunk and world sizes
+RENDER_SCALE = PIXEL_CANVAS_SCALE if PIXEL_CANVAS else 1 # Window pixels per pixel of the world and characters as drawn
+
+### Start positions
+CAT_START_Y = WORLD_HEIGHT - int(0.25*WINDOW_HEIGHT) - REF_CAT_HEIGHT
+CAT_RESPAWN_Y = WORLD_HEIGHT - 150 - REF_CAT_HEIGHT
+DOG_START_Y = WORLD_HEIGHT - WINDOW_HEIGHT - REF_DOG_HEIGHT
+
 ### Noise
-NOISE_OCTAVES = 6
+NOISE_OCTAVES = 6 # Noise lattice cells across the world (the base frequency)
+NOISE_LAYERS = 1 # Fractal octaves layered on top of the base frequency
+NOISE_PERSISTENCE = 0.5 # Amplitude falloff per octave
 NOISE_CLUSTER_SIZE = 48
 NOISE_SURFACE_SIZE = 128
 NOISE_ALPHA = 12
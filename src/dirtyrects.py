@@ -0,0 +1,94 @@
+# Imports
+import pygame
+
+from constants import *
+
+
+# Functions
+
+## Merge overlapping rects so no pixel is redrawn or pushed twice
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        # Absorb every merged rect this one touches until nothing overlaps it any more
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+# Dirty-rectangle bookkeeping: redraws and pushes only what changed since the last frame
+class DirtyRects:
+
+    def __init__(self, size=(WINDOW_WIDTH, WINDOW_HEIGHT)):
+        self.screen = pygame.Rect((0, 0), size)
+        self.previous = [] # Screen rects of what moved or animated last frame
+        self.current = []
+        self.changed = [] # Rects of HUD elements whose state changed this frame
+        self.tracked = {} # HUD element -> (rect, state) when last drawn
+        self.viewport_y = None
+        self.full = True
+        self.pixels = 0 # Pixels pushed by the last frame
+        self.total_pixels = 0
+        self.frames = 0
+        self.full_frames = 0
+
+    ## Force a full redraw (first frame, after blocking screens or effects drew over the window)
+    def invalidate(self):
+        self.full = True
+
+    ## Start a frame; scrolling moves every pixel, so it forces a full redraw
+    def begin(self, viewport_y):
+        if viewport_y != self.viewport_y:
+            self.viewport_y = viewport_y
+            self.full = True
+        self.current = []
+        self.changed = []
+
+    ## Something drawn at `rect` this frame that may differ from the last one (characters, animated UI)
+    def add(self, rect):
+        self.current.append(pygame.Rect(rect))
+
+    ## A HUD element that is only dirty when its state changes
+    def track(self, name, rect, state):
+        rect = pygame.Rect(rect)
+        last = self.tracked.get(name)
+        if last is None or last[1] != state:
+            self.changed.append(rect)
+            if last is not None:
+                self.changed.append(last[0])
+        self.tracked[name] = (rect, state)
+
+    ## Redraw the dirty areas with `draw(area)` (area None = whole window) and push them to the display
+    def present(self, surface, draw):
+        if self.full:
+            draw(None)
+            pygame.display.update()
+            rects = [self.screen]
+            self.full_frames += 1
+        else:
+            rects = [rect for rect in merge_rects(self.previous + self.current + self.changed) if rect.colliderect(self.screen)]
+            rects = [rect.clip(self.screen) for rect in rects]
+            for rect in rects:
+                surface.set_clip(rect)
+                draw(rect)
+            surface.set_clip(None)
+            pygame.display.update(rects)
+        self.pixels = sum(rect.width * rect.height for rect in rects)
+        self.total_pixels += self.pixels
+        self.frames += 1
+        self.previous = self.current
+        self.full = False
+
+    ## Pushed pixels, to compare against full-window updates
+    def stats(self):
+        return {
+            'pixels': self.pixels,
+            'average_pixels': self.total_pixels / self.frames if self.frames else 0,
+            'window_pixels': self.screen.width * self.screen.height,
+            'full_frames': self.full_frames,
+            'frames': self.frames,
+        }
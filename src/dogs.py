@@ -0,0 +1,123 @@
+# Imports
+import numpy as np
+import pygame
+
+from constants import *
+
+
+# Dog table layout
+
+## Dog types, stored as indices into this list
+DOG_TYPES = list(DOG_BASE_WEIGHTS.keys())
+DOG_TYPE_IDS = {dog: i for i, dog in enumerate(DOG_TYPES)}
+DOUBLE_DAMAGE_IDS = np.array([DOG_TYPE_IDS[dog] for dog in DOUBLE_DAMAGE_DOGS])
+
+## Facings, stored as indices into this list
+DIRECTIONS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+DIRECTION_IDS = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+## One array per column
+DOG_COLUMNS = {
+    'kind': np.int8,            # Index into DOG_TYPES
+    'x': np.int32,              # Rect position
+    'y': np.int32,
+    'width': np.int32,          # Rect size
+    'height': np.int32,
+    'horizontal': np.int32,     # Movement direction multipliers
+    'vertical': np.int32,
+    'speed': np.float64,        # Pixels per tick
+    'frame': np.int32,          # Animation frame index
+    'frame_count': np.int64,    # Time of the last animation frame change
+    'facing': np.int8,          # Index into DIRECTIONS
+}
+## Columns the simulation owns (the rest is animation state written by the renderer)
+SIMULATION_COLUMNS = ('kind', 'x', 'y', 'width', 'height', 'horizontal', 'vertical', 'speed')
+INITIAL_CAPACITY = 16
+
+
+# Functions
+
+### Round like pygame.Rect does when assigned a float (half away from zero)
+def round_half_away(values):
+    return np.trunc(values + np.copysign(0.5, values))
+
+
+# Structure-of-arrays dog state
+class DogTable:
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._count = 0
+        self._data = {column: np.zeros(capacity, dtype) for column, dtype in DOG_COLUMNS.items()}
+
+    def __len__(self):
+        return self._count
+
+    ## Columns are exposed as views of the live rows
+    def __getattr__(self, column):
+        try:
+            return self.__dict__['_data'][column][:self.__dict__['_count']]
+        except KeyError:
+            raise AttributeError(column)
+
+    ## Grow all columns geometrically so appends stay amortized O(1)
+    def _reserve(self, capacity):
+        if capacity <= len(self._data['x']):
+            return
+        capacity = max(capacity, 2 * len(self._data['x']))
+        for column, array in self._data.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self._count] = array[:self._count]
+            self._data[column] = grown
+
+    ## Append a dog, centered on the given position
+    def add(self, dog, center, size, facing='E'):
+        self._reserve(self._count + 1)
+        i = self._count
+        self._count += 1
+        width, height = size
+        row = self._data
+        row['kind'][i] = DOG_TYPE_IDS[dog]
+        row['x'][i] = center[0] - width // 2
+        row['y'][i] = center[1] - height // 2
+        row['width'][i] = width
+        row['height'][i] = height
+        row['horizontal'][i] = 1
+        row['vertical'][i] = 0
+        row['speed'][i] = DOG_SPEED_X
+        row['frame'][i] = 0
+        row['frame_count'][i] = 0
+        row['facing'][i] = DIRECTION_IDS[facing]
+        return i
+
+    ## Remove every dog
+    def clear(self):
+        self._count = 0
+
+    ## Name of the dog type in a row
+    def type_of(self, i):
+        return DOG_TYPES[self.kind[i]]
+
+    ## Rect of a row
+    def rect(self, i):
+        return pygame.Rect(int(self.x[i]), int(self.y[i]), int(self.width[i]), int(self.height[i]))
+
+    ## Advance every dog by one tick: bounce at the edges, ramp the speed and move
+    def move(self, border_reaches, rng, speed_cap=DOG_SPEED_CAP):
+        n = self._count
+        if n == 0:
+            return
+        x, y, horizontal, vertical = self.x, self.y, self.horizontal, self.vertical
+
+        ### Walking back and forth
+        at_left = x <= 0
+        at_right = x >= WINDOW_WIDTH - self.width
+        horizontal[at_left] = 1
+        horizontal[at_right] = -1
+        vertical[at_left | at_right] = 0
+
+        ### Dog speed increases with each border reach
+        self.speed[:] = np.minimum(DOG_SPEED_X + 2*border_reaches*rng.integers(1, 101, n)*0.01, speed_cap)
+
+        ### Apply dog movement
+        x[:] = round_half_away(x + horizontal * self.speed)
+        y -= vertical
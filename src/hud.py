@@ -0,0 +1,78 @@
+# Imports
+import time
+import pygame
+
+from constants import *
+
+
+# HUD composited into one cached surface; an element is redrawn only when its state changes
+class HudLayer:
+
+    def __init__(self, background=None, width=WINDOW_WIDTH):
+        self.background = background # Drawn under every element (e.g. the horizon overlay)
+        height = background.get_bounding_rect().bottom if background else 0
+        self.surface = pygame.Surface((width, max(height, 1)), pygame.SRCALPHA)
+        self.elements = {} # Element -> (rect for a state, draw onto a surface for a state)
+        self.states = {} # Element -> state it was last drawn with
+        self.rects = {} # Element -> area it was last drawn to
+        self.rebuilds = 0
+        self.blits = 0
+        self.second_started = time.perf_counter()
+        self.rebuilds_per_second = 0
+        self.last_second_rebuilds = 0
+
+    ## Register an element, drawn in registration order
+    def element(self, name, rect, draw):
+        self.elements[name] = (rect, draw)
+
+    ## Redraw the elements whose state changed (and anything they overlap); returns the areas that changed
+    def update(self, **states):
+        changed = [name for name, state in states.items() if name not in self.states or self.states[name] != state]
+        if not changed:
+            return []
+
+        areas = [] if self.states else [self.surface.get_rect()] # The first build draws the whole background
+        for name in changed:
+            rect = pygame.Rect(self.elements[name][0](states[name]))
+            if name in self.rects:
+                areas.append(self.rects[name])
+            areas.append(rect)
+            self.rects[name] = rect
+        self.states.update(states)
+        area = areas[0].unionall(areas[1:])
+
+        if area.bottom > self.surface.get_height():
+            surface = pygame.Surface((self.surface.get_width(), area.bottom), pygame.SRCALPHA)
+            surface.blit(self.surface, (0, 0))
+            self.surface = surface
+
+        # Restore the background under the changed area, then draw every element touching it in order
+        self.surface.set_clip(area)
+        self.surface.fill((0, 0, 0, 0))
+        if self.background:
+            self.surface.blit(self.background, (0, 0))
+        for name, (_, draw) in self.elements.items():
+            if name in self.states and self.rects[name].colliderect(area):
+                draw(self.states[name], self.surface)
+        self.surface.set_clip(None)
+
+        self.rebuilds += len(changed)
+        return areas
+
+    ## Blit the whole HUD in one go (clipped to the target's clip area, if any)
+    def draw(self, target):
+        target.blit(self.surface, (0, 0))
+        self.blits += 1
+        now = time.perf_counter()
+        if now - self.second_started >= 1:
+            self.rebuilds_per_second = (self.rebuilds - self.last_second_rebuilds) / (now - self.second_started)
+            self.last_second_rebuilds = self.rebuilds
+            self.second_started = now
+
+    ## Rebuild counters: a steady state is one blit per frame and no rebuilds
+    def stats(self):
+        return {
+            'rebuilds': self.rebuilds,
+            'rebuilds_per_second': self.rebuilds_per_second,
+            'blits': self.blits,
+        }
@@ -1,262 +1,251 @@
 # Imports
 import os
+import atexit
 import platform
-import json
 import pygame
 import random
 import numpy as np
-from perlin_noise import PerlinNoise
 
 from constants import *
+from simulation import Simulation, new_seed, read_inputs, EVENT_HIT, EVENT_HARD_HIT, EVENT_LEVEL_COMPLETE, EVENT_GAME_OVER
+from saves import SaveStore
+from world import World
+from bake import asset_path, bake_key, load_bake, convert_bake, pack_bake, write_bake
+from assets import AssetManager
+from textcache import TextCache
+from clips import ClipCache
+from dirtyrects import DirtyRects
+from hud import HudLayer
+from animation import CatAnimation, DogAnimations
+from spritebatch import SpriteBatch
+from sprites import get_sprite, cut_sprites, build_sprites, shrink_sprites
+from collision import collision_masks
+from transitions import Tween, Overlay, Layer, ClipLayer, Effect, Transitions, rise_and_fall
+from profiler import FrameProfiler
+from replay import InputRecorder
 
 
 # Functions
 
-## Saving and loading
-
-### Get platform-specific path to save directory
-def get_save_path(app_name=GAME_TITLE):
-    try:
-        home = os.path.expanduser('~')
-        if platform.system() == 'Windows':
-            return os.path.join(os.getenv('APPDATA', home), app_name)
-        elif platform.system() == 'Darwin':  # macOS
-            return os.path.join(home, 'Library', 'Application Support', app_name)
-        else:  # Linux and other Unix-like OS
-            return os.path.join(home, '.local', 'share', app_name)
-    except Exception:
-        return os.path.join(os.getcwd(), app_name)
-
-### Save game data to file
-def save_game_data(data, app_name=GAME_TITLE, file_name=SAVE_FILE_NAME):
-    save_path = get_save_path(app_name)
-    os.makedirs(save_path, exist_ok=True)
-    file_path = os.path.join(save_path, file_name)
-    with open(file_path, 'w') as file:
-        json.dump(data, file)
-
-### Load game data from file
-def load_game_data(app_name=GAME_TITLE, file_name=SAVE_FILE_NAME):
-    file_path = os.path.join(get_save_path(app_name), file_name)
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as file:
-            return json.load(file)
-    return {"highscore": 0}
-
-### Delete save data
-def delete_save_data(app_name=GAME_TITLE, file_name=SAVE_FILE_NAME):
-    file_path = os.path.join(get_save_path(app_name), file_name)
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
-### Write high score to file
-def write_high_score(score):
-    data = load_game_data()
-    if data is None:
-        data = {'highscore': score}
-    else:
-        data['highscore'] = max(score, data['highscore'])
-    save_game_data(data)
-
-
 ## Asset loading and sprite extraction
 
-### Loading sprite sheet from file
-def load_sprite_sheet(filename):
-    return pygame.image.load(filename).convert_alpha()
-
-def get_sprite(sheet, x, y, width, height, scale_x, scale_y):
-    sprite = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
-    sprite.blit(sheet, (0, 0), (x, y, width, height))
-    if scale_x and scale_y:
-        sprite = pygame.transform.scale(sprite, (width*scale_x, height*scale_y))
-    return sprite
-
-def generate_sprites(sheet, coordinates, scale_x, scale_y):
-    sprites = {}
-    for direction, coordinates in coordinates.items():
-        sprites[direction] = [get_sprite(sheet, *coord, scale_x, scale_y) for coord in coordinates]
-    if 'E' in sprites and 'W' not in sprites:
-        sprites['W'] = [pygame.transform.flip(sprite, True, False) for sprite in sprites['E']]
-    return sprites
-
-
-## Drawing world
-
-## Drawing world tiles
-def fill_world_with_tiles(texture_sets):
-    for y in range(0, WORLD_HEIGHT, TILE_SIZE):
-        for x in range(0, WORLD_WIDTH, TILE_SIZE):
-            for texture_set in texture_sets:
-                chosen_texture = random.choice(texture_set)
-                world_surface.blit(chosen_texture, (x, y))
-
-## Drawing noise
-def draw_noise(octaves=NOISE_OCTAVES):
-    noise = PerlinNoise(octaves=octaves)
-    for y in range(0, WORLD_HEIGHT, NOISE_CLUSTER_SIZE):
-        for x in range(0, WORLD_WIDTH, NOISE_CLUSTER_SIZE):
-            noise_surface = pygame.Surface((NOISE_SURFACE_SIZE, NOISE_SURFACE_SIZE), pygame.SRCALPHA).convert_alpha()
-            noise_surface.fill((0, 0, 0, NOISE_ALPHA))
-            noise_surface.set_alpha(noise([x / WORLD_WIDTH, y / WORLD_HEIGHT]) * 255)
-            world_surface.blit(noise_surface, (x, y))
+### Loading a sound effect at its configured volume
+def load_sound(sound):
+    sound_effect = pygame.mixer.Sound(asset_path('audio', 'sounds', f'{sound}.mp3'))
+    sound_effect.set_volume(SOUNDS[sound])
+    return sound_effect
+
+### Loading the gameplay graphics on a worker: the bake cache if it is current, otherwise the source images
+# UI elements used as they are always come from their images, only the scaled ones are baked
+def load_graphics():
+    key = bake_key()
+    images = {ui_element: pygame.image.load(asset_path('ui', f'{ui_element}.png')) for ui_element in UI_LIST if ui_element not in UI_SCALES}
+    baked = load_bake(key, convert=False)
+    if baked is not None:
+        return key, baked, None, images
+    sheets = {sheet: pygame.image.load(asset_path('sprites', f'{sheet}.png')) for sheet in SPRITE_LIST + ['grass']}
+    images.update({ui_element: pygame.image.load(asset_path('ui', f'{ui_element}.png')) for ui_element in UI_SCALES})
+    return key, None, sheets, images
+
+### Finishing the gameplay graphics on the main thread: scale the baked frames, or cut, scale and bake them on a first launch
+# Everything is scaled to window resolution; at a RENDER_SCALE the characters are shrunk once their masks are taken
+def finish_graphics(loaded):
+    key, baked, sheets, images = loaded
+    ui_elements = {ui_element: image.convert_alpha() for ui_element, image in images.items()}
+    masks = {}
+    if baked is not None:
+        frames, scaled_ui, world_seed, world_chunks = convert_bake(baked)
+        ui_elements.update(scaled_ui)
+        sprites = build_sprites(frames, masks)
+        world = World([sprites['grass'],], world_seed, baked=world_chunks, scale=RENDER_SCALE)
+        return render_sprites(sprites), ui_elements, world, masks
+
+    #### Cut the frames at source size, then scale them (taking their collision masks)
+    frames = {sprite: cut_sprites(sheets[sprite].convert_alpha(), SPRITE_COORDINATES[sprite]) for sprite in SPRITE_LIST}
+    frames['grass'] = [get_sprite(sheets['grass'].convert(), *coord, None, None) for coord in GRASS_COORDINATES]
+    # frames['plant'] = [get_sprite(pygame.image.load(asset_path('sprites', 'plants.png')).convert(), *coord, None, None) for coord in PLANT_COORDINATES]
+    sprites = build_sprites(frames, masks)
+
+    #### Resize UI elements
+    for ui_element, scale in UI_SCALES.items():
+        ui_elements[ui_element] = pygame.transform.scale(ui_elements[ui_element], (int(ui_elements[ui_element].get_width() * scale), int(ui_elements[ui_element].get_height() * scale))).convert_alpha()
+
+    #### Generate the world background and bake the processed graphics for the next launch (written in the background)
+    world = World([sprites['grass'],], scale=RENDER_SCALE) # plant_textures])
+    world.baked = world.generate_all() # Streamed in from here instead of being generated a second time
+    packed = pack_bake(key, frames, {ui_element: ui_elements[ui_element] for ui_element in UI_SCALES}, world.seed, world.baked)
+    assets.load('bake', 'bake', lambda: write_bake(packed))
+    return render_sprites(sprites), ui_elements, world, masks
+
+### Character sprites at the size they are drawn (the grass tiles stay full size for generating world chunks)
+def render_sprites(sprites):
+    if RENDER_SCALE == 1:
+        return sprites
+    return {**sprites, **{sprite: shrink_sprites(sprites[sprite], RENDER_SCALE) for sprite in SPRITE_LIST}}
+
+### Waiting for a group of assets behind the loading screen
+def wait_for_assets(group):
+    clock = pygame.time.Clock()
+    while True:
+        assets.poll()
+        if assets.ready(group):
+            return
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                assets.shutdown() # Drop what has not started loading instead of waiting for it
+                pygame.quit()
+                quit()
+        draw_loading_screen(assets.progress(group))
+        pygame.display.update()
+        clock.tick(FPS)
+
+### Handing out the gameplay assets once they are loaded
+def finish_loading():
+    wait_for_assets('game')
+    sprites, ui_elements, world, masks = assets['graphics']
+    ui.update(ui_elements)
+    sounds.update({sound: assets[f'sound/{sound}'] for sound in SOUNDS})
+    world.prefetch((WORLD_HEIGHT - WINDOW_HEIGHT) // RENDER_SCALE, WINDOW_HEIGHT // RENDER_SCALE)
+    if DEBUG:
+        print(f"Menu ready after {assets.time_to_ready('menu'):.3f}s, all assets after {assets.time_to_ready('game'):.3f}s")
+    return sprites, world, masks
 
 
 ## Drawing UI
 
-### Fading to black
-def fade_black(frames):
-    fade_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert_alpha()
-    fade_surface.fill((0, 0, 0))
-    for alpha in range(0, 256, 5):
-        fade_surface.set_alpha(alpha)
-        game_window.blit(fade_surface, (0, 0))
+### Drawing the loading screen
+def draw_loading_screen(progress):
+    game_window.fill((0, 0, 0))
+    bar_rect = pygame.Rect(WINDOW_WIDTH // 2 - PROGRESS_BAR_LENGTH // 2, WINDOW_HEIGHT // 2, PROGRESS_BAR_LENGTH, 20)
+    pygame.draw.rect(game_window, (255, 255, 255), bar_rect)
+    pygame.draw.rect(game_window, (0, 255, 0), (bar_rect.x, bar_rect.y, PROGRESS_BAR_LENGTH * progress, 20))
+    if 'font' in assets:
+        text = assets['font'].render("loading...", True, (255, 255, 255))
+        game_window.blit(text, text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 30)))
+
+### Playing an effect to the end over a still of the window (menu screens wait for their transitions)
+def play_transition(effect):
+    background = game_window.copy()
+    clock = pygame.time.Clock()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+        game_window.blit(background, (0, 0))
+        effect.draw(game_window)
         pygame.display.update()
-        pygame.time.delay(frames)
+        if effect.done:
+            break
+        effect.update(clock.tick(FPS))
+
+### Fading to black (`frames` ms per step, 52 steps)
+def fade_black(frames):
+    play_transition(Effect([Overlay((0, 0, 0), Tween(0, 255, 52 * frames))], 52 * frames))
 
-### Flashing the screen red
+### Flashing the screen red (over the running game)
 def flash_screen_red():
-    flash_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert_alpha()
-    flash_surface.fill((255, 0, 0))
-    for alpha in range(0, 32, 4):
-        flash_surface.set_alpha(alpha)
-        game_window.blit(flash_surface, (0, 0))
-        pygame.display.update()
-        pygame.time.delay(5)
+    transitions.start(Effect([Overlay((255, 0, 0), Tween(0, FLASH_ALPHA, FLASH_DURATION, easing=rise_and_fall))], FLASH_DURATION))
 
 ### Drawing the completions counter
-def draw_counter(border_reaches):
-    text = font.render(f"score: {border_reaches}", True, (255, 255, 255))
-    text_shadow = font.render(f"score: {border_reaches}", True, (0, 0, 64))
-    game_window.blit(text_shadow, (WINDOW_WIDTH // 2 + 220 + 2, 45+2))
-    game_window.blit(text, (WINDOW_WIDTH // 2 + 220, 45))
+def draw_counter(border_reaches, surface=None):
+    text = text_cache.render(f"score: {border_reaches}", (255, 255, 255), shadow=(0, 0, 64))
+    surface = game_window if surface is None else surface
+    surface.blit(text, (WINDOW_WIDTH // 2 + 220, 45))
 
 ### Drawing the high score counter
 def draw_high_score(high_score):
-    text = font.render(f"high score: {high_score}", True, (255, 255, 255))
-    text_shadow = font.render(f"high score: {high_score}", True, (0, 0, 64))
-    game_window.blit(text_shadow, (WINDOW_WIDTH // 2 + 140 + 2, 85+2))
+    text = text_cache.render(f"high score: {high_score}", (255, 255, 255), shadow=(0, 0, 64))
     game_window.blit(text, (WINDOW_WIDTH // 2 + 140, 85))
 
-### Drawing the progress bar
-def draw_progress_bar(viewport_y):
+### Filled length of the progress bar, in whole steps of PROGRESS_BAR_STEP pixels (what the bar actually shows)
+def progress_filled(viewport_y):
     progress = (WORLD_HEIGHT - WINDOW_HEIGHT - viewport_y) / (WORLD_HEIGHT - WINDOW_HEIGHT)
-    bar_length = 225  # Total length of the bar
-    filled_length = bar_length * progress
-    pygame.draw.rect(game_window, (0, 0, 0), (20 + 2, 20 + 2, bar_length, 20))  # Draw the shadow of the bar
-    pygame.draw.rect(game_window, (255, 255, 255), (20, 20, bar_length, 20))  # Draw the border of the bar
-    pygame.draw.rect(game_window, (0, 255, 0), (20, 20, filled_length, 20))  # Draw the filled part of the bar
+    return int(PROGRESS_BAR_LENGTH * progress) // PROGRESS_BAR_STEP * PROGRESS_BAR_STEP
+
+### Drawing the progress bar
+def draw_progress_bar(filled_length, surface=None):
+    surface = game_window if surface is None else surface
+    pygame.draw.rect(surface, (0, 0, 0), (20 + 2, 20 + 2, PROGRESS_BAR_LENGTH, 20))  # Draw the shadow of the bar
+    pygame.draw.rect(surface, (255, 255, 255), (20, 20, PROGRESS_BAR_LENGTH, 20))  # Draw the border of the bar
+    pygame.draw.rect(surface, (0, 255, 0), (20, 20, filled_length, 20))  # Draw the filled part of the bar
 
 ### Drawing the health hearts
-def draw_hearts(health):
+def draw_hearts(health, surface=None):
+    surface = game_window if surface is None else surface
     for i in range(health + 1):
-        game_window.blit(ui['heart_bg'], (WINDOW_WIDTH // 2 - 56 + i * 48 + 2, 16 + 2))
-        game_window.blit(ui['heart'], (WINDOW_WIDTH // 2 - 56 + i * 48, 16))
-        game_window.blit(ui['heart_border'], (WINDOW_WIDTH // 2 - 56 + i * 48, 16))
-
-### Drawing the level border
-def draw_level_border():
-    # Fill the border area with a gradient
-    for y in range(BORDER_Y, BORDER_Y + BORDER_HEIGHT):
-        for x in range(WORLD_WIDTH):
-            # Calculate alpha based on distance from the top of the border
-            alpha = 255 - (y - BORDER_Y) / BORDER_HEIGHT * 255
-            fade_surface = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
-            fade_surface.fill((0, 0, 0, alpha))
-            world_surface.blit(fade_surface, (x, y))
-
-### Drawing the horizon
-def draw_horizon():
-    game_window.blit(ui['overlay_horizon'], (0, 0))
-
-### Drawing the 'UP' arrow
-def draw_arrow(viewport_y, size=128, color=(255, 255, 0), alpha=128):
-    position = (WINDOW_WIDTH // 2 - size // 2, WINDOW_HEIGHT // 3 - (viewport_y - 2400))  # Position of the arrow
-    # Create a surface for the arrow
-    arrow_surface = pygame.Surface((size, size), pygame.SRCALPHA).convert_alpha()
-    arrow_surface.fill((0, 0, 0, 0))  # Make the surface fully transparent
-    # Define points for the arrow
-    arrow_points = [
-        (size // 2, 0),             # Top point
-        (size, size),               # Bottom right
-        (size // 2, size * 2 // 3), # Middle
-        (0, size)                   # Bottom left
-    ]
-    alpha = 180 + 60 * np.sin(pygame.time.get_ticks() / 256)
-    pygame.draw.polygon(arrow_surface, color + (alpha,), arrow_points)
-    game_window.blit(arrow_surface, position)
-
-
-## Drawing the level end screen
+        surface.blit(ui['heart_bg'], (WINDOW_WIDTH // 2 - 56 + i * 48 + 2, 16 + 2))
+        surface.blit(ui['heart'], (WINDOW_WIDTH // 2 - 56 + i * 48, 16))
+        surface.blit(ui['heart_border'], (WINDOW_WIDTH // 2 - 56 + i * 48, 16))
+
+### Screen area of the progress bar (with its shadow)
+def progress_rect(filled_length):
+    return pygame.Rect(20, 20, PROGRESS_BAR_LENGTH + 2, 20 + 2)
+
+### Screen area of the health hearts
+def hearts_rect(health):
+    width, height = ui['heart'].get_size()
+    return pygame.Rect(WINDOW_WIDTH // 2 - 56, 16, health * 48 + width + 2, height + 2)
+
+### Screen area of the completions counter
+def counter_rect(border_reaches):
+    return text_cache.render(f"score: {border_reaches}", (255, 255, 255), shadow=(0, 0, 64)).get_rect(topleft=(WINDOW_WIDTH // 2 + 220, 45))
+
+### Building the HUD layer: counter, progress bar and hearts over the horizon, composited once and redrawn on change
+def make_hud():
+    hud = HudLayer(ui['overlay_horizon'])
+    hud.element('counter', counter_rect, draw_counter)
+    hud.element('progress', progress_rect, draw_progress_bar)
+    hud.element('hearts', hearts_rect, draw_hearts)
+    return hud
+
+### Screen area of the 'UP' arrow
+def arrow_rect(viewport_y, size=128):
+    return pygame.Rect(WINDOW_WIDTH // 2 - size // 2, WINDOW_HEIGHT // 3 - (viewport_y - 2400), size, size)
+
+### Drawing the 'UP' arrow: the cached arrow, pulsing through its surface alpha
+def draw_arrow(viewport_y, size=128, color=(255, 255, 0)):
+    arrow_surface = clips.arrow(size, color)
+    arrow_surface.set_alpha(int(180 + 60 * np.sin(pygame.time.get_ticks() / 256)))
+    game_window.blit(arrow_surface, arrow_rect(viewport_y, size))
+
+
+## Level end screen: fades to black with the score (and any new records) fading in over it
 def draw_end_screen(border_reaches, old_high_score=0):
-    fade_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-    fade_surface.fill((0, 0, 0))
-        
-    text = font.render(f"score: {border_reaches}", True, (255, 255, 255))
-    text_hs = font.render("NEW HIGH SCORE!", True, (255, 255, 0))
-    text_ss = font.render("YOU UNLOCKED SPECIAL MUSIC AND START SCREEN!", True, (255, 190, 200))
-    for alpha in np.linspace(0, 255, 60):
-        fade_surface.set_alpha(alpha)
-        text.set_alpha(alpha)
-        text_ss.set_alpha(alpha)
-        text_hs.set_alpha(alpha)
-        game_window.blit(text, (WINDOW_WIDTH // 2 - text.get_width() // 2, WINDOW_HEIGHT // 2 - text.get_height() // 2))
-        delay = 10
-        if border_reaches > old_high_score:
-            game_window.blit(text_hs, (WINDOW_WIDTH // 2 - text_hs.get_width() // 2, WINDOW_HEIGHT // 2 + 50 - text_hs.get_height() // 2))
-            delay = 20
-        if border_reaches >= SPECIAL_SCORE:
-            game_window.blit(text_ss, (WINDOW_WIDTH // 2 - text_ss.get_width() // 2, WINDOW_HEIGHT // 2 + 100 - text_ss.get_height() // 2))
-            delay = 50
-        game_window.blit(fade_surface, (0, 0))
-        pygame.display.update()
-        pygame.time.delay(delay)
-    pygame.display.update()
-
-## Drawing the game over screen: Fade in 'screen_death' from ui and then
+    center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+    duration = 60 * 10
+    lines = [(f"score: {border_reaches}", (255, 255, 255), 0)]
+    if border_reaches > old_high_score:
+        lines.append(("NEW HIGH SCORE!", (255, 255, 0), 50))
+        duration = 60 * 20
+    if border_reaches >= SPECIAL_SCORE:
+        lines.append(("YOU UNLOCKED SPECIAL MUSIC AND START SCREEN!", (255, 190, 200), 100))
+        duration = 60 * 50
+
+    # The texts fade in together, so they are composited once and faded as one surface
+    texts, texts_rect = clips.text_block(lines, center)
+    layers = [Overlay((0, 0, 0), Tween(0, 255, duration)), Layer(texts, texts_rect.center, alpha=Tween(0, 255, duration))]
+    transitions.start(Effect(layers, duration, pauses=True))
+
+## Game over screen: fade to black, a growing 'YOU DIED', then the scores; the menu follows once it ends
 def draw_game_over_screen(border_reaches):
     pygame.mixer.music.stop()
     sounds['you-died'].play()
 
-    fade_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-    fade_surface.fill((0, 0, 0))
-    for alpha in range(0, 256, 5):
-        fade_surface.set_alpha(alpha)
-        game_window.blit(fade_surface, (0, 0))
-        pygame.display.update()
-        pygame.time.delay(20)
-
-    # Fading in "YOU DIED" text
-    for size in np.linspace(10, 100, 100):  # Gradual increase in text size
-        text = pygame.font.Font.render(font, "YOU DIED", True, (255, 0, 0))
-        text = pygame.transform.scale(text, (int(text.get_width() * (size / 100)), int(text.get_height() * (size / 100))))
-        text_rect = text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-        game_window.blit(fade_surface, (0, 0))
-        game_window.blit(text, text_rect)
-        pygame.display.update()
-        pygame.time.delay(10)
-    pygame.time.delay(500)
-
-    # Display border reaches
-    reach_text = pygame.font.Font.render(font, f"score: {border_reaches}", True, (255, 255, 255))
-    reach_rect = reach_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 60))
-    game_window.blit(reach_text, reach_rect)
-    pygame.display.update()
-
-    # Display high score
-    high_score = load_game_data()["highscore"]
-    msg = f"high score: {high_score}"
-    color = (255, 255, 255)
-    high_score_text = pygame.font.Font.render(font, msg, True, color)
-    high_score_rect = high_score_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 120))
-    game_window.blit(high_score_text, high_score_rect)
-    pygame.display.update()
-    pygame.time.delay(1000)
-
     # Stop sound effect and resume music
-    sounds['you-died'].stop()
-    pygame.mixer.music.play(-1)
-    pygame.mixer.music.set_volume(0.2)
+    def finish():
+        sounds['you-died'].stop()
+        pygame.mixer.music.play(-1)
+        pygame.mixer.music.set_volume(0.2)
+
+    fade, grow, pause, hold = 52 * 20, 100 * 10, 500, 1000
+    high_score = save_store["highscore"]
+    layers = [
+        Overlay((0, 0, 0), Tween(0, 255, fade)),
+        ClipLayer(clips.scaled_text("YOU DIED", (255, 0, 0), 0.1, 1), (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2), Tween(0.1, 1, grow, delay=fade), start=fade),
+        Layer(text_cache.render(f"score: {border_reaches}", (255, 255, 255)), (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 60), start=fade + grow + pause),
+        Layer(text_cache.render(f"high score: {high_score}", (255, 255, 255)), (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 120), start=fade + grow + pause),
+    ]
+    transitions.start(Effect(layers, fade + grow + pause + hold, pauses=True, on_finish=finish))
 
 ### Displaying credits
 def display_credits():
@@ -266,13 +255,14 @@ def display_credits():
     fade_black(10)
     credits = True
     while credits:
+        assets.poll()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
         keys = pygame.key.get_pressed()
 
         for i, line in enumerate(credits_text):
-            text = font.render(line.strip(), True, (255, 255, 255))
+            text = text_cache.render(line.strip(), (255, 255, 255))
             text_rect = text.get_rect(center=(WINDOW_WIDTH // 2, 100 + i * 30))
             game_window.blit(text, text_rect)
 
@@ -286,17 +276,18 @@ def display_keybinds():
     fade_black(10)
     keybinds = True
     while keybinds:
+        assets.poll()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
         keys = pygame.key.get_pressed()
-        color = (85, 170, 170) if load_game_data()["highscore"] < SPECIAL_SCORE else (254, 140, 180)
+        color = (85, 170, 170) if save_store["highscore"] < SPECIAL_SCORE else (254, 140, 180)
         pygame.draw.rect(game_window, color, (0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
         game_window.blit(ui['screen_keybinds'], (0, 0))
 
-        # Assign text_color so it fades in and out
-        text_color = (155 + 100 * np.sin(pygame.time.get_ticks() / 256),) * 3
-        text = font.render("PRESS ANY KEY TO CONTINUE", True, text_color).convert_alpha()
+        # Assign text_color so it fades in and out (in steps, so the cache holds a few dozen renders)
+        text_color = (int(155 + 100 * np.sin(pygame.time.get_ticks() / 256)) // TEXT_FADE_STEP * TEXT_FADE_STEP,) * 3
+        text = text_cache.render("PRESS ANY KEY TO CONTINUE", text_color)
         text_rect = text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 500))
         game_window.blit(text, text_rect)
 
@@ -312,6 +303,7 @@ def display_menu(cursor, ui, border_reaches=0):
     menu = True
 
     while menu:
+        assets.poll()
         pygame.draw.rect(game_window, (0, 0, 0, 0), START_BUTTON_COORDINATES) # Start button rect
         game_window.blit(ui['screen_start'], (0, 0))
         for event in pygame.event.get():
@@ -330,12 +322,13 @@ def display_menu(cursor, ui, border_reaches=0):
                 pygame.time.delay(250) # Lazy way to debounce
         
         if keys[pygame.K_q]:
+            assets.shutdown() # The gameplay assets may still be loading behind the menu
             pygame.quit()
             quit()
         if keys[pygame.K_c]:
             display_credits()
         if keys[pygame.K_DELETE]:
-            delete_save_data()
+            save_store.delete()
             pygame.quit()
 
         if pygame.mouse.get_pressed()[0] or keys[pygame.K_RETURN] or keys[pygame.K_ESCAPE]:
@@ -348,150 +341,89 @@ def display_menu(cursor, ui, border_reaches=0):
             if keys[pygame.K_1]:
                 border_reaches += 1
                 high_score = border_reaches
-                write_high_score(high_score)
+                save_store.write_high_score(high_score)
                 pygame.time.delay(100)
             if keys[pygame.K_2]:
                 border_reaches = 0
                 high_score = border_reaches
-                write_high_score(high_score)
+                save_store.write_high_score(high_score)
                 pygame.time.delay(100)
 
-        high_score = load_game_data()["highscore"]
+        high_score = save_store["highscore"]
         draw_counter(border_reaches)
         draw_high_score(high_score)
         pygame.display.update()
 
 
-## Animation
-
-### Retrieval of current animation frame
-def get_animation_frame(sprites, horizontal_movement, vertical_movement, current_frame, frame_count, last_movement, walk_frames, animation_speed, type=None):
-    current_time = pygame.time.get_ticks()
-    offset = (0, 0)
-
-    if current_time - frame_count > animation_speed:
-        frame_count = current_time
-        current_frame = (current_frame + 1) % walk_frames
-
-    try:
-        if vertical_movement < 0:  # Moving down
-            image = sprites['S'][current_frame]
-            last_movement = 'S'
-            offset = (0, -10)
-        if vertical_movement > 0:  # Moving up
-            image = sprites['N'][current_frame]
-            last_movement = 'N'
-        if horizontal_movement > 0:  # Moving right
-            image = sprites['E'][current_frame]
-            last_movement = 'E'
-            offset = (-30, 0)
-        if horizontal_movement < 0:  # Moving left
-            image = sprites['W'][current_frame]
-            last_movement = 'W'
-            offset = (-10, 0)
-        if horizontal_movement > 0 and vertical_movement < 0:  # Moving down-right
-            image = sprites['SE'][current_frame]
-            last_movement = 'SE'
-            offset = (-40, 10)
-        if horizontal_movement > 0 and vertical_movement > 0:  # Moving up-right
-            image = sprites['NE'][current_frame]
-            last_movement = 'NE'
-            offset = (-40, 10)
-        if horizontal_movement < 0 and vertical_movement < 0:  # Moving down-left
-            image = sprites['SW'][current_frame]
-            last_movement = 'SW'
-        if horizontal_movement < 0 and vertical_movement > 0:  # Moving up-left
-            image = sprites['NW'][current_frame]
-            last_movement = 'NW'
-            offset = (0, 10)
-        if horizontal_movement == 0 and vertical_movement == 0:  # Idle
-            idle_mapping = {'N': 0, 'NE': 1, 'E': 1, 'SE': 1, 'S': 2, 'SW': 2, 'W': 3, 'NW': 3}
-            image = sprites['ID'][idle_mapping[last_movement]]
-            offset = (-50, 0) if last_movement == 'E' else offset
-    except KeyError:
-        image = sprites['E'][0]
-    
-    offset = (0, 0) if type == "dog" else offset
-    return image, current_frame, frame_count, last_movement, offset
-
-### Drawing a character
-def draw_character(image, rect, viewport_y, offset=(0, 0), type=None):
-    draw_rect = rect.move(offset)
-    screen_y = draw_rect.y - viewport_y
-    game_window.blit(image, (draw_rect.x, screen_y))
+## Characters
+
+### Queueing the cat and the dogs in view: frames are only picked for dogs that survive culling
+def batch_characters(batch, simulation, cat_animation, dog_animations, now):
+    simulation.sync_dogs()
+    batch.begin(simulation.viewport_y)
+    cat_image, offset = cat_animation.update(now, simulation.horizontal_cat_movement, simulation.vertical_cat_movement)
+    batch.add(cat_image, simulation.cat_rect, offset, "cat")
+
+    dogs = simulation.dogs
+    sizes = dog_animations.sizes[dogs.kind] * batch.scale
+    rows = batch.visible(dogs.x, dogs.y, np.maximum(dogs.width, sizes[:, 0]), np.maximum(dogs.height, sizes[:, 1]))
+    dog_images = dog_animations.update(dogs, now, DOG_ANIMATION_SPEED/(0.5*(simulation.border_reaches+1)), rows)
+    batch.add_rows(dog_images, dogs.x[rows], dogs.y[rows], dogs.width[rows], dogs.height[rows], "dog")
+
+### Drawing the world, characters and UI, or only what falls within `area` of the window
+# With the pixel canvas, the world and characters go into the canvas, which is scaled up to the window in one go
+def draw_scene(world, simulation, batch, hud, area=None):
+    viewport_y = simulation.viewport_y
+    if canvas is not None:
+        world.blit_visible(canvas, viewport_y // world.scale, *canvas.get_size())
+    elif area is None:
+        world.blit_visible(game_window, viewport_y)
+    else:
+        world.blit_area(game_window, area.topleft, area.move(0, viewport_y))
+    profiler.mark('world')
+
+    if canvas is not None:
+        batch.draw(canvas)
+        profiler.mark('characters')
+        pygame.transform.scale(canvas, game_window.get_size(), game_window) # Nearest neighbor, so the pixels stay crisp
+        profiler.mark('upscale')
+    else:
+        batch.draw(game_window, area)
+        profiler.mark('characters')
+
+    if area is None or area.colliderect(arrow_rect(viewport_y, 96)):
+        draw_arrow(viewport_y, 96, (200, 200, 150))
+    hud.draw(game_window)
+    profiler.mark('hud')
+    transitions.draw(game_window)
     if DEBUG:
-        bound_rect = (draw_rect.x, screen_y, draw_rect.width, draw_rect.height)
-        pygame.draw.rect(game_window, (255, 0, 0), bound_rect, 1)
-        if type == "cat":
-            collision_rect = rect.scale_by(CAT_HITBOX_SCALE_X, CAT_HITBOX_SCALE_Y)
-            collision_rect.y -= viewport_y
-        if type == "dog":
-            collision_rect = rect.scale_by(DOG_HITBOX_SCALE_X, DOG_HITBOX_SCALE_Y)
-            collision_rect.y -= viewport_y
-        pygame.draw.rect(game_window, (0, 255, 0), collision_rect, 1)
-
-### Picking a dog
-def pick_dog(dogs=[]):
-    dog_weights = DOG_BASE_WEIGHTS.copy()
-    # Increase the weight of exotic and boss dogs based on the number of dogs
-    dog_weights['boss_walking'] += len(dogs)*0.1
-    dog_weights['boss_boxing'] += len(dogs)*0.05
-    # Normalize weights
-    dog_weights = {k: v / sum(dog_weights.values()) for k, v in dog_weights.items()}
-    # Pick a dog
-    return np.random.choice(list(dog_weights.keys()), p=list(dog_weights.values()))
-
-### Dog spawn position function
-def get_dog_spawn(dog_rects, border_reaches):
-    # Calculate dynamic gap for this turn (decreses with each border reach)
-    dynamic_gap = max(MIN_GAP - border_reaches * GAP_REDUCTION_FACTOR, REF_DOG_WIDTH)
-    # Calculate the maximum spawn height
-    upper_limit = WORLD_HEIGHT-(WORLD_HEIGHT - VIEWPORT_BUFFER)
-    # Calculate the minimum spawn height
-    lower_limit = dog_start_y
-    
-    tries = 0
-    while True:
-        if tries >= MAX_SPAWN_TRIES:
-            break
-        # Randomize the spawn position within the allowed range
-        spawn_pos = random.randint(*sorted([lower_limit, upper_limit]))
-        tries += 1
-        # Check if the spawn position is too close to another dog
-        if all([abs(spawn_pos - dog_rect.y) > dynamic_gap for dog_rect in dog_rects]):
-            break
-    return (REF_DOG_WIDTH, spawn_pos)
+        game_window.blit(profiler.render_overlay(font), profiler_rect())
+    profiler.mark('effects')
 
+### Screen area of the profiler overlay (bottom left)
+def profiler_rect():
+    return profiler.render_overlay(font).get_rect(bottomleft=(0, WINDOW_HEIGHT))
 
 # Game Loop
-def game_loop(sprites, cursor, ui, cat_rect, dog_rects, sounds, viewport_y=WORLD_HEIGHT-WINDOW_HEIGHT, border_reaches=0, high_score=0):
+def game_loop(cursor, ui, simulation, high_score=0):
 
     ## Initialization
     running = True
     clock = pygame.time.Clock()
-    
-    ### Animation initialization
+    accumulator = 0
+    dirty = DirtyRects() if DIRTY_RECTS and canvas is None else None # The upscaled canvas covers the whole window anyway
+    batch = SpriteBatch(scale=RENDER_SCALE)
+    frames = 0
+    rasterizations = 0 # Text cache rasterizations at the last debug report
+    recorder = InputRecorder.start(simulation) # Input log of the current run, saved when it ends
+
     first_run = True
-    last_cat_movement = 'N'
-    last_dog_movements = ['E']
-    current_cat_frame = 0
-    current_dog_frames = [0]
-    cat_frame_count = 0
-    dog_frame_counts = [0]
-    horizontal_cat_movement = 0
-    vertical_cat_movement = 0
-    horizontal_dog_movements = [1]
-    vertical_dog_movements = [0]
-    dog_speeds = [DOG_SPEED_X]
-    dog_images = [None]
-    dogs = ['dog_white']
-    health = DEFAULT_HEALTH
-    last_hit = 0
 
     display_keybinds()
 
     ## Main game loop
     while running:
+        profiler.start_frame()
         for event in pygame.event.get():
 
             ### Quitting the game
@@ -502,124 +434,121 @@ def game_loop(sprites, cursor, ui, cat_rect, dog_rects, sounds, viewport_y=WORLD
 
         ### Check for ui input
         if keys[pygame.K_ESCAPE] or first_run:
+            display_menu(cursor, ui, simulation.border_reaches)
+            if first_run:
+                sprites, world, masks = finish_loading()
+                if PIXEL_COLLISION:
+                    simulation.masks = collision_masks(masks)
+                    recorder = InputRecorder.start(simulation) # Nothing is recorded yet, start over with the collision mode in the header
+                hud = make_hud()
+                cat_animation = CatAnimation(sprites['cat_grey'])
+                dog_animations = DogAnimations(sprites)
             first_run = False
-            display_menu(cursor, ui, border_reaches)
-
-        ### Movement
-
-        #### Horizontal movement with boundary check
-        if keys[pygame.K_a] and cat_rect.x > 0:
-            horizontal_cat_movement = -1
-        if keys[pygame.K_d] and cat_rect.x < WINDOW_WIDTH - cat_rect.width:
-            horizontal_cat_movement = 1
-
-        #### Vertical movement with boundary check
-        if keys[pygame.K_w] and cat_rect.y > viewport_y - cat_rect.height:
-            viewport_y = max(0, viewport_y - CAT_SPEED_Y)
-            vertical_cat_movement = 1
-        if keys[pygame.K_s] and cat_rect.y < WORLD_HEIGHT - cat_rect.height:
-            viewport_y = min(WORLD_HEIGHT - WINDOW_HEIGHT, viewport_y + CAT_SPEED_Y)
-            vertical_cat_movement = -1
-
-        #### Apply cat movement
-        cat_rect.x += horizontal_cat_movement * CAT_SPEED_X
-        cat_rect.y -= vertical_cat_movement * CAT_SPEED_Y
-
-        #### Dog movement (walking back and forth)
-        for i in range(len(dogs)):
-            if dog_rects[i].x <= 0:
-                horizontal_dog_movements[i] = 1
-                vertical_dog_movements[i] = 0
-            if dog_rects[i].x >= WINDOW_WIDTH - dog_rects[i].width:
-                horizontal_dog_movements[i] = -1
-                vertical_dog_movements[i] = 0
-            
-            #### Dog speed increases with each border reach
-            dog_speeds[i] = min((DOG_SPEED_X + 2*border_reaches*random.randint(1, 100)*0.01), DOG_SPEED_CAP)
-
-            #### Apply dog movement
-            dog_rects[i].x += horizontal_dog_movements[i] * dog_speeds[i]
-            dog_rects[i].y -= vertical_dog_movements[i]
-        
-        #### Check for border collision
-        if cat_rect.top <= viewport_y - cat_rect.height:
-            border_reaches += 1
-            picked_dog = pick_dog(dogs)
-            dogs.append(picked_dog)
-            old_high_score = load_game_data()["highscore"]
-            high_score = border_reaches
-            write_high_score(high_score)
-            dog_spawn = get_dog_spawn(dog_rects, border_reaches)
-            if picked_dog in ['boss_walking', 'boss_boxing']:
-                dog_rects.append(idle_boss.get_rect(center=dog_spawn))
-            else:
-                dog_rects.append(idle_dog.get_rect(center=dog_spawn))
-            horizontal_dog_movements.append(1)
-            vertical_dog_movements.append(0)
-            last_dog_movements.append(random.choice(['E','W']))
-            dog_frame_counts.append(0)
-            current_dog_frames.append(0)
-            dog_images.append(None)
-            dog_speeds.append(DOG_SPEED_X)
-            sounds['level-complete'].play()
-            draw_end_screen(border_reaches, old_high_score)
-            cat_rect.y = WORLD_HEIGHT - 150 - REF_CAT_HEIGHT
-            viewport_y = WORLD_HEIGHT - WINDOW_HEIGHT
-
-        ### Check for dog collision
-        for i, dog in enumerate(dogs):
-            if cat_rect.scale_by(CAT_HITBOX_SCALE_X, CAT_HITBOX_SCALE_Y).colliderect(dog_rects[i].scale_by(DOG_HITBOX_SCALE_X, DOG_HITBOX_SCALE_Y)):
-                if pygame.time.get_ticks() - last_hit <= IMMUNITY_TIME:
-                    pass
-                elif health > 0 and pygame.time.get_ticks() - last_hit > IMMUNITY_TIME:
-                    # cat_hurt = True
-                    last_hit = pygame.time.get_ticks()
-                    if dog in DOUBLE_DAMAGE_DOGS:
-                        sounds['cat-hurt-hard'].play()
-                        health -= 2
-                    else:
-                        sounds['cat-hurt-light'].play()
-                        health -= 1
-                    flash_screen_red()
-                    horizontal_dog_movements[i] = -horizontal_dog_movements[i]*4
-                    vertical_dog_movements[i] = vertical_cat_movement*2
-                else:
-                    draw_game_over_screen(border_reaches)
-                    cat_rect.y = WORLD_HEIGHT - 150 - REF_CAT_HEIGHT
-                    viewport_y = WORLD_HEIGHT - WINDOW_HEIGHT
-                    dogs = [pick_dog()]
-                    write_high_score(border_reaches)
-                    border_reaches = 0
-                    health = DEFAULT_HEALTH
-                    display_menu(cursor, ui)
-
-        ### Drawing the visible part of the world
-        visible_rect = pygame.Rect(0, viewport_y, WINDOW_WIDTH, WINDOW_HEIGHT)
-        game_window.blit(world_surface, (0, 0), visible_rect)
-
-        ### Animation
-        cat_image, current_cat_frame, cat_frame_count, last_cat_movement, offset = get_animation_frame(sprites['cat_grey'], horizontal_cat_movement, vertical_cat_movement, current_cat_frame, cat_frame_count, last_cat_movement, CAT_WALK_FRAMES, CAT_ANIMATION_SPEED, type="cat")
-        draw_character(cat_image, cat_rect, viewport_y, offset, type="cat")
-        
-        for i in range(len(dogs)):
-            dog_images[i], current_dog_frames[i], dog_frame_counts[i], last_dog_movements[i], offset = get_animation_frame(sprites[dogs[i]], horizontal_dog_movements[i], vertical_dog_movements[i], current_dog_frames[i], dog_frame_counts[i], last_dog_movements[i], DOG_WALK_FRAMES, DOG_ANIMATION_SPEED/(0.5*(border_reaches+1)), type="dog")
-            draw_character(dog_images[i], dog_rects[i], viewport_y, type="dog")
-
-        ### Drawing UI
-        draw_arrow(viewport_y, 96, (200, 200, 150), 200)
-        draw_horizon()
-        draw_counter(border_reaches)
-        draw_progress_bar(viewport_y)
-        draw_hearts(health)
-
-        ### Reset
-        horizontal_cat_movement = 0
-        vertical_cat_movement = 0
-
-        ### Game clock
-        pygame.display.update()
-        clock.tick(FPS)
-
+            clock.tick()
+            accumulator = 0
+            if dirty:
+                dirty.invalidate()
+            profiler.start_frame() # Time spent in the menu is not part of the frame
+        assets.poll()
+
+        ### Back to the menu once the game over screen has played
+        if simulation.game_over and not transitions.paused():
+            save_store.write_high_score(simulation.border_reaches)
+            recorder.save(simulation.checksum())
+            simulation.restart(new_seed())
+            recorder = InputRecorder.start(simulation)
+            display_menu(cursor, ui)
+            clock.tick()
+            accumulator = 0
+            if dirty:
+                dirty.invalidate()
+            profiler.start_frame() # Time spent in the menu is not part of the frame
+
+        ### Advance the simulation in fixed ticks (held while a level end or game over screen plays)
+        inputs = read_inputs(keys)
+        profiler.mark('input')
+        ticks = 0
+        if transitions.paused():
+            accumulator = 0
+        while accumulator >= TICK_MS and ticks < MAX_TICKS_PER_FRAME:
+            accumulator -= TICK_MS
+            ticks += 1
+            recorder.record(inputs)
+            events = simulation.step(inputs)
+
+            #### Border reached
+            if EVENT_LEVEL_COMPLETE in events:
+                old_high_score = save_store["highscore"]
+                save_store.write_high_score(simulation.border_reaches)
+                sounds['level-complete'].play()
+                draw_end_screen(simulation.border_reaches, old_high_score)
+
+            #### Hit by a dog
+            if EVENT_HARD_HIT in events:
+                sounds['cat-hurt-hard'].play()
+                flash_screen_red()
+            elif EVENT_HIT in events:
+                sounds['cat-hurt-light'].play()
+                flash_screen_red()
+
+            #### Out of health
+            if EVENT_GAME_OVER in events:
+                draw_game_over_screen(simulation.border_reaches)
+
+            if transitions.paused():
+                accumulator = 0
+                break
+        if ticks == MAX_TICKS_PER_FRAME:
+            accumulator = 0 # Drop the backlog instead of spiralling after a long stall
+        profiler.mark('events')
+
+        viewport_y = simulation.viewport_y
+
+        ### Animation (one clock reading for the cat and every dog)
+        batch_characters(batch, simulation, cat_animation, dog_animations, pygame.time.get_ticks())
+        profiler.mark('animation')
+
+        ### Drawing the world, characters and UI
+        hud.update(counter=simulation.border_reaches, progress=progress_filled(viewport_y), hearts=simulation.health)
+        profiler.mark('hud')
+        if dirty and (transitions.effects or transitions.was_visible):
+            dirty.invalidate() # Overlays cover the whole window
+        if dirty:
+            # Only the characters, the pulsing arrow and HUD elements that changed get redrawn and pushed
+            dirty.begin(viewport_y)
+            for rect in batch.rects:
+                dirty.add(rect)
+            dirty.add(arrow_rect(viewport_y, 96))
+            for name in hud.elements:
+                dirty.track(name, hud.rects[name], hud.states[name])
+            if DEBUG:
+                dirty.add(profiler_rect())
+            dirty.present(game_window, lambda area: draw_scene(world, simulation, batch, hud, area))
+        else:
+            draw_scene(world, simulation, batch, hud)
+            pygame.display.update()
+        profiler.mark('present')
+
+        frames += 1
+        if DEBUG and frames % FPS == 0:
+            print(f"HUD: {hud.stats()['rebuilds_per_second']:.1f} rebuilds/s")
+            print(f"Sprites: {batch.stats()['drawn']} drawn, {batch.stats()['culled']} culled")
+            text_stats = text_cache.stats()
+            print(f"Text cache: {text_stats['rasterizations'] - rasterizations} rasterizations in the last {FPS} frames ({text_stats['hits']} hits, {text_stats['misses']} misses, {text_stats['rasterizations']} rasterizations in total)")
+            rasterizations = text_stats['rasterizations']
+            if dirty:
+                stats = dirty.stats()
+                print(f"Dirty rects: {stats['pixels']} px pushed this frame, {stats['average_pixels']:.0f} on average of {stats['window_pixels']} ({stats['full_frames']}/{stats['frames']} full frames)")
+
+        ### Game clock (effects run on frame time, so they keep going while the simulation is held)
+        frame_time = clock.tick(FPS)
+        profiler.mark('wait')
+        accumulator += frame_time
+        transitions.update(frame_time)
+        profiler.mark('effects')
+        profiler.end_frame()
+
+    assets.shutdown()
     pygame.quit(0)
 
 
@@ -643,59 +572,45 @@ if __name__ == "__main__":
     ## Initialize Pygame
     pygame.init()
     game_window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    canvas = pygame.Surface((WINDOW_WIDTH // PIXEL_CANVAS_SCALE, WINDOW_HEIGHT // PIXEL_CANVAS_SCALE)).convert() if PIXEL_CANVAS else None
     pygame.display.set_caption(GAME_TITLE)
     pygame.display.set_icon(pygame.image.load(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/ui/icon.png'))).convert_alpha())
 
-    ## Load assets
-
-    ### Load, pregenerate, and store sprites
-    sprites = {sprite: generate_sprites(load_sprite_sheet(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/sprites/{sprite}.png'))).convert_alpha(), SPRITE_COORDINATES[sprite], SPRITE_SCALES[0][sprite], SPRITE_SCALES[1][sprite]) for sprite in SPRITE_LIST}
-    sprites.update({'grass': [get_sprite(load_sprite_sheet(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/sprites/grass.png'))).convert(), *coord, TILE_SCALE, TILE_SCALE) for coord in GRASS_COORDINATES]})
-    # sprites.update({'plant': [get_sprite(load_sprite_sheet(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/sprites/plants.png'))).convert(), *coord, TILE_SCALE, TILE_SCALE) for coord in PLANT_COORDINATES]})
-    
-    ### Load and store UI elements
-    ui = {ui_element: pygame.image.load(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/ui/{ui_element}.png'))).convert_alpha() for ui_element in UI_LIST}
-    font = pygame.font.Font(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/ui/pico-8.otf')), 24)
-
-    ### Resize UI elements
-    ui['heart'] = pygame.transform.scale(ui['heart'], (int(ui['heart'].get_width() * 2), int(ui['heart'].get_height() * 2))).convert_alpha()
-    ui['heart_bg'] = pygame.transform.scale(ui['heart_bg'], (int(ui['heart_bg'].get_width() * 2), int(ui['heart_bg'].get_height() * 2))).convert_alpha()
-    ui['heart_border'] = pygame.transform.scale(ui['heart_border'], (int(ui['heart_border'].get_width() * 2), int(ui['heart_border'].get_height() * 2))).convert_alpha()
-    
-    ### Load and store sounds
-    sounds = {sound: pygame.mixer.Sound(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/audio/sounds/{sound}.mp3'))) for sound in SOUNDS.keys()}
-    for sound, volume in SOUNDS.items():
-        sounds[sound].set_volume(volume)
-
-    ## Load high score and special assets if applicable
-    high_score = load_game_data()["highscore"]
-    if high_score >= SPECIAL_SCORE:
-        pygame.mixer.music.load(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/audio/music/blippy_trance.mp3')))
-        ui['screen_start'] = ui['screen_start_special']
-        cursor = pygame.image.load(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/ui/cursor_black.cur'))).convert_alpha()
-    else:
-        pygame.mixer.music.load(os.path.join(os.path.dirname(__file__), f'assets/audio/music/doobly_doo.mp3'))
-        ui['screen_start'] = ui['screen_start_normal']
-        cursor = pygame.image.load(os.path.abspath(os.path.join(os.path.dirname(__file__), f'assets/ui/cursor_grey.cur'))).convert_alpha()
-
-    ## Initialize game world
-    world_surface = pygame.Surface((WORLD_WIDTH, WORLD_HEIGHT)).convert()
-    fill_world_with_tiles([sprites['grass'],]) # plant_textures])
-    draw_noise()
-
-    ## Initialize characters
-    ### Initialize cat   
-    cat_start_y = WORLD_HEIGHT - int(0.25*WINDOW_HEIGHT) - REF_CAT_HEIGHT
-    idle_cat = sprites['cat_grey']['ID'][0]
-    cat_rect = idle_cat.get_rect(center=(WINDOW_WIDTH // 2, cat_start_y))
-    ### Initialize dog
-    dog_start_y = WORLD_HEIGHT - WINDOW_HEIGHT - REF_DOG_HEIGHT
-    idle_dog = sprites['dog_white']['E'][0]
-    idle_boss = sprites['boss_walking']['E'][0]
-    dog_rects = [idle_dog.get_rect(center=(REF_DOG_WIDTH, dog_start_y))]
+    ## Load assets in the background
+    save_store = SaveStore()
+    assets = AssetManager()
+    transitions = Transitions()
+    profiler = FrameProfiler(enabled=PROFILE or DEBUG)
+    if profiler.enabled:
+        atexit.register(profiler.dump)
+    high_score = save_store["highscore"]
+    special = high_score >= SPECIAL_SCORE
+
+    ### What the menu needs comes first: start screen, keybinds screen, cursor, font and music
+    assets.load('font', 'menu', lambda: pygame.font.Font(asset_path('ui', 'pico-8.otf'), 24))
+    assets.load('screen_start', 'menu', lambda: pygame.image.load(asset_path('ui', 'screen_start_special.png' if special else 'screen_start_normal.png')), pygame.Surface.convert_alpha)
+    assets.load('screen_keybinds', 'menu', lambda: pygame.image.load(asset_path('ui', 'screen_keybinds.png')), pygame.Surface.convert_alpha)
+    assets.load('cursor', 'menu', lambda: pygame.image.load(asset_path('ui', 'cursor_black.cur' if special else 'cursor_grey.cur')), pygame.Surface.convert_alpha)
+    assets.load('music', 'menu', lambda: pygame.mixer.music.load(asset_path('audio', 'music', 'blippy_trance.mp3' if special else 'doobly_doo.mp3')))
+
+    ### Gameplay sprites, UI, world background and sounds stream in behind them
+    assets.load('graphics', 'game', load_graphics, finish_graphics)
+    for sound in SOUNDS:
+        assets.load(f'sound/{sound}', 'game', lambda sound=sound: load_sound(sound))
+
+    wait_for_assets('menu')
+    font = assets['font']
+    text_cache = TextCache(asset_path('ui', 'pico-8.otf'), 24, font)
+    clips = ClipCache(text_cache)
+    cursor = assets['cursor']
+    ui = {'screen_start': assets['screen_start'], 'screen_keybinds': assets['screen_keybinds']}
+    sounds = {}
+
+    ## Initialize the simulation (cat and dogs)
+    simulation = Simulation(new_seed(), profiler=profiler)
 
     ## Start the game
     pygame.mouse.set_visible(False)
     pygame.mixer.music.play(-1)
     pygame.mixer.music.set_volume(0.2)
-    game_loop(sprites, cursor, ui, cat_rect, dog_rects, sounds, high_score=high_score)
+    game_loop(cursor, ui, simulation, high_score=high_score)
@@ -0,0 +1,83 @@
+# Imports
+import numpy as np
+
+from constants import *
+
+
+# Functions
+
+## Lattice gradients
+
+### Hash integer lattice coordinates and a seed to pseudo-random gradients, uniform over the square [-1, 1]^2 (not unit length)
+# perlin_noise's sample_vector draws them the same way (uniform(-1, 1) per component, despite its docstring)
+def lattice_gradients(ix, iy, seed):
+    with np.errstate(over='ignore'):
+        h = (ix.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) ^ (iy.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)) ^ np.uint64(seed * 0x165667B19E3779F9 & 0xFFFFFFFFFFFFFFFF)
+        # splitmix64 finalizer
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h = h ^ (h >> np.uint64(31))
+    gx = (h & np.uint64(0xFFFFFFFF)).astype(np.float64) / 0xFFFFFFFF * 2 - 1
+    gy = (h >> np.uint64(32)).astype(np.float64) / 0xFFFFFFFF * 2 - 1
+    return gx, gy
+
+### Perlin's quintic smoothstep
+def fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+## Noise
+
+### One layer of gradient noise, evaluated on the grid xs x ys (same corner weighting and gradient distribution as perlin_noise.PerlinNoise)
+def perlin_layer(xs, ys, seed):
+    x = np.asarray(xs, np.float64)[:, np.newaxis]
+    y = np.asarray(ys, np.float64)[np.newaxis, :]
+    x0 = np.floor(x).astype(np.int64)
+    y0 = np.floor(y).astype(np.int64)
+    value = np.zeros((x.shape[0], y.shape[1]))
+    for cx in (0, 1):
+        for cy in (0, 1):
+            dx = x - (x0 + cx)
+            dy = y - (y0 + cy)
+            gx, gy = lattice_gradients(*np.broadcast_arrays(x0 + cx, y0 + cy), seed)
+            value += fade(1 - np.abs(dx)) * fade(1 - np.abs(dy)) * (gx * dx + gy * dy)
+    return value
+
+### Fractal noise on the grid xs x ys: octaves layers, each at double the frequency and persistence times the amplitude
+def noise_field(xs, ys, frequency=NOISE_OCTAVES, octaves=NOISE_LAYERS, persistence=NOISE_PERSISTENCE, seed=0):
+    xs = np.asarray(xs, np.float64)
+    ys = np.asarray(ys, np.float64)
+    value = np.zeros((len(xs), len(ys)))
+    amplitude = 1
+    for octave in range(octaves):
+        value += amplitude * perlin_layer(xs * frequency, ys * frequency, seed + octave)
+        frequency *= 2
+        amplitude *= persistence
+    return value
+
+
+## World noise overlay
+
+### Alpha of the darkening noise overlay for world rows [top, top + height)
+# Every NOISE_CLUSTER_SIZE step of the world gets a NOISE_SURFACE_SIZE square of black at NOISE_ALPHA,
+# faded by the noise value there. The squares overlap, so the coverage of every pixel is
+# composited in log space with two matrix products instead of blitting each square.
+def noise_alpha(width, height, top=0, frequency=NOISE_OCTAVES, octaves=NOISE_LAYERS, persistence=NOISE_PERSISTENCE, seed=0):
+    # Squares that can reach the requested rows
+    first_row = max(0, (top - NOISE_SURFACE_SIZE) // NOISE_CLUSTER_SIZE + 1)
+    cell_xs = np.arange(0, width, NOISE_CLUSTER_SIZE)
+    cell_ys = np.arange(first_row * NOISE_CLUSTER_SIZE, top + height, NOISE_CLUSTER_SIZE)
+    values = noise_field(cell_xs / WORLD_WIDTH, cell_ys / WORLD_HEIGHT, frequency, octaves, persistence, seed)
+
+    # Opacity of each square: its surface alpha (noise * 255, clamped like set_alpha) times the fill alpha
+    opacity = np.clip(values * 255, 0, 255).astype(np.int32) / 255 * NOISE_ALPHA / 255
+    log_transmittance = np.log1p(-opacity)
+
+    # Which squares cover which pixel columns and rows
+    pixel_xs = np.arange(width)
+    pixel_ys = np.arange(top, top + height)
+    cover_x = (pixel_xs[:, np.newaxis] >= cell_xs) & (pixel_xs[:, np.newaxis] < cell_xs + NOISE_SURFACE_SIZE)
+    cover_y = (pixel_ys[:, np.newaxis] >= cell_ys) & (pixel_ys[:, np.newaxis] < cell_ys + NOISE_SURFACE_SIZE)
+
+    transmittance = np.exp(cover_x @ log_transmittance @ cover_y.T)
+    return 255 * (1 - transmittance)
@@ -0,0 +1,50 @@
+# Imports
+import numpy as np
+import pygame
+
+
+# Functions
+
+## Building overlays from alpha arrays
+
+### Single-color overlay surface whose per-pixel alpha comes from a (width, height) array
+def make_overlay(alpha, color=(0, 0, 0)):
+    width, height = alpha.shape
+    overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+    overlay.fill(tuple(color[:3]) + (0,))
+    pixels = pygame.surfarray.pixels_alpha(overlay)
+    pixels[:] = np.clip(alpha, 0, 255).astype(np.uint8)
+    del pixels # Unlock the surface
+    return overlay
+
+
+## Alpha ramps
+
+### Linear ramp from start_alpha to end_alpha, top to bottom (or left to right)
+def gradient_alpha(size, start_alpha=255, end_alpha=0, vertical=True):
+    width, height = size
+    steps = height if vertical else width
+    ramp = start_alpha + (end_alpha - start_alpha) * np.arange(steps) / steps
+    if vertical:
+        return np.broadcast_to(ramp, (width, height))
+    return np.broadcast_to(ramp[:, np.newaxis], (width, height))
+
+### Radial ramp: transparent inside inner_radius, reaching max_alpha at the corners
+def vignette_alpha(size, max_alpha=255, inner_radius=0.5, power=2):
+    width, height = size
+    x = (np.arange(width) + 0.5) / width * 2 - 1
+    y = (np.arange(height) + 0.5) / height * 2 - 1
+    distance = np.sqrt(x[:, np.newaxis] ** 2 + y[np.newaxis, :] ** 2) / np.sqrt(2)
+    ramp = np.clip((distance - inner_radius) / (1 - inner_radius), 0, 1)
+    return max_alpha * ramp ** power
+
+
+## Ready-made overlays
+
+### Gradient overlay surface
+def make_gradient(size, color=(0, 0, 0), start_alpha=255, end_alpha=0, vertical=True):
+    return make_overlay(gradient_alpha(size, start_alpha, end_alpha, vertical), color)
+
+### Vignette overlay surface
+def make_vignette(size, color=(0, 0, 0), max_alpha=255, inner_radius=0.5, power=2):
+    return make_overlay(vignette_alpha(size, max_alpha, inner_radius, power), color)
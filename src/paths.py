@@ -0,0 +1,154 @@
+# Imports
+import numpy as np
+
+from constants import *
+from dogs import round_half_away
+from collision import scale_spans
+
+
+# Anchor columns: the state a dog's path starts from, everything later follows in closed form
+PATH_COLUMNS = {
+    'time': np.int64,       # Move count the anchor was taken at
+    'x': np.int64,          # Position at the anchor
+    'y': np.int64,
+    'horizontal': np.int64, # Direction multiplier of the first leg (e.g. -4 right after a hit)
+    'vertical': np.int64,   # Vertical drift per move of the first leg
+    'step': np.int64,       # Whole pixels per move once back to walking
+    'right': np.int64,      # Right edge the dog bounces at (window width minus its width)
+    'legs': np.int64,       # Moves of the first leg, before the first bounce
+    'low': np.int64,        # Top of the lane band (the y range the dog can be in from the anchor on)
+    'high': np.int64,       # Bottom of the lane band
+}
+
+
+# Functions
+
+### Ceiling of a / b for positive b
+def ceil_div(a, b):
+    return -(-a // b)
+
+### Position and movement of anchored dogs `elapsed` moves after their anchors
+# A dog keeps its first leg's direction until it reaches an edge (x <= 0 or x >= right), then walks back
+# and forth with `step`: it turns on the first move at or past an edge, which makes the walk periodic
+def path_state(x0, y0, horizontal0, vertical0, step, right, legs, elapsed):
+    ### First leg
+    moves = np.minimum(elapsed, legs)
+    first = elapsed <= legs
+    x_first = x0 + horizontal0 * step * moves
+    y_end = y0 - vertical0 * legs
+
+    ### Walking back and forth, in coordinates mirrored so the walk starts at (or past) the left edge
+    x_end = x0 + horizontal0 * step * legs
+    from_left = x_end <= 0
+    u_end = np.where(from_left, x_end, right - x_end)
+    to_top = ceil_div(right - u_end, step) # Moves to the first position at or past the far edge
+    top = u_end + to_top * step
+    half = to_top - (-u_end) // step # Moves from the far edge back to the last position at or past the near edge
+    walked = np.maximum(elapsed - legs, 0)
+    phase = (walked - to_top) % (2 * half)
+    rising = walked <= to_top
+    u = np.where(rising, u_end + walked * step, top - np.minimum(phase, 2 * half - phase) * step)
+    u_direction = np.where(rising | (phase == 0) | (phase > half), 1, -1)
+
+    x = np.where(first, x_first, np.where(from_left, u, right - u))
+    y = np.where(first, y0 - vertical0 * moves, y_end)
+    horizontal = np.where(first, horizontal0, np.where(from_left, u_direction, -u_direction))
+    vertical = np.where(first, vertical0, 0)
+    return x, y, horizontal, vertical
+
+### Earliest time in [0, 1] at which two boxes moving linearly over a tick overlap (inf if they don't)
+# Boxes are (x, y, width, height) at the start of the tick, motions (dx, dy) over it; overlap is strict, like pygame.Rect
+def time_of_impact(a, a_motion, b, b_motion):
+    enter = np.full(np.shape(b[0]), -np.inf)
+    leave = np.full(np.shape(b[0]), np.inf)
+    for axis in (0, 1):
+        # The boxes overlap on this axis while low < gap < high
+        gap = a[axis] - b[axis]
+        low, high = -a[axis + 2], b[axis + 2]
+        motion = np.broadcast_to(a_motion[axis] - b_motion[axis], enter.shape)
+        moving = motion != 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_low = (low - gap) / motion
+            t_high = (high - gap) / motion
+        enter = np.where(moving, np.maximum(enter, np.minimum(t_low, t_high)), np.where((gap > low) & (gap < high), enter, np.inf))
+        leave = np.where(moving, np.minimum(leave, np.maximum(t_low, t_high)), leave)
+    # The open overlap interval (enter, leave) has to meet the tick [0, 1]
+    hit = (enter < leave) & (enter < 1) & (leave > 0)
+    return np.where(hit, np.maximum(enter, 0), np.inf)
+
+
+# Closed-form dog paths, anchored at spawns, level starts and hits
+class DogPaths:
+
+    def __init__(self):
+        self.time = 0 # Moves made so far
+        self.anchors = {column: np.zeros(0, dtype) for column, dtype in PATH_COLUMNS.items()}
+
+    def __getattr__(self, column):
+        try:
+            return self.__dict__['anchors'][column]
+        except KeyError:
+            raise AttributeError(column)
+
+    ## Dog speed for a level, drawn once and rounded to whole pixels (dogs walk a fixed step per level)
+    def draw_steps(self, count, border_reaches, rng, speed_cap=DOG_SPEED_CAP):
+        speeds = np.minimum(DOG_SPEED_X + 2*border_reaches*rng.integers(1, 101, count)*0.01, speed_cap)
+        return round_half_away(speeds).astype(np.int64)
+
+    ## Start paths for dog rows just appended to the table
+    def add(self, dogs, rows, steps):
+        for column, values in self.anchors.items():
+            self.anchors[column] = np.concatenate((values, np.zeros(len(rows), values.dtype)))
+        self.anchor(dogs, rows, steps, dogs.horizontal[rows], dogs.vertical[rows])
+
+    ## Restart the paths of `rows` from their current row state (materialize them first)
+    def anchor(self, dogs, rows, step, horizontal, vertical):
+        a = self.anchors
+        x, y = dogs.x[rows].astype(np.int64), dogs.y[rows].astype(np.int64)
+        right = (WINDOW_WIDTH - dogs.width[rows]).astype(np.int64)
+        horizontal = np.asarray(horizontal, np.int64)
+        speed = np.abs(horizontal) * step
+        inside = (x > 0) & (x < right)
+        legs = np.where(inside, ceil_div(np.where(horizontal > 0, right - x, x), speed), 0)
+        a['time'][rows] = self.time
+        a['x'][rows], a['y'][rows] = x, y
+        a['horizontal'][rows], a['vertical'][rows] = horizontal, vertical
+        a['step'][rows], a['right'][rows], a['legs'][rows] = step, right, legs
+        y_end = y - np.asarray(vertical, np.int64) * legs
+        a['low'][rows] = np.minimum(y, y_end)
+        a['high'][rows] = np.maximum(y, y_end) + dogs.height[rows]
+        dogs.horizontal[rows], dogs.vertical[rows] = horizontal, vertical
+        dogs.speed[rows] = step
+
+    ## State of `rows` at move `time` (default: now)
+    def state(self, rows, time=None):
+        a = self.anchors
+        elapsed = (self.time if time is None else time) - a['time'][rows]
+        return path_state(a['x'][rows], a['y'][rows], a['horizontal'][rows], a['vertical'][rows], a['step'][rows], a['right'][rows], a['legs'][rows], elapsed)
+
+    ## Write the current state of `rows` into the dog table
+    def write(self, dogs, rows):
+        dogs.x[rows], dogs.y[rows], dogs.horizontal[rows], dogs.vertical[rows] = self.state(rows)
+
+    ## Rows whose lane band overlaps [top, bottom)
+    def rows_between(self, top, bottom):
+        return np.flatnonzero((self.anchors['low'] < bottom) & (self.anchors['high'] > top))
+
+    ## Hit test of a cat hitbox moving from `before` to `after` over the last move, against `rows`
+    # Returns the rows it touched during the move, earliest impact first
+    def sweep(self, dogs, rows, before, after):
+        if len(rows) == 0:
+            return rows
+        width, height = dogs.width[rows], dogs.height[rows]
+        boxes = []
+        for time in (self.time - 1, self.time):
+            x, y, _, _ = self.state(rows, time)
+            hx, hw = scale_spans(x, width, DOG_HITBOX_SCALE_X)
+            hy, hh = scale_spans(y, height, DOG_HITBOX_SCALE_Y)
+            boxes.append((hx, hy, hw, hh))
+        (hx, hy, hw, hh), (hx1, hy1, _, _) = boxes
+        cat = (before.x, before.y, before.width, before.height)
+        impact = time_of_impact(cat, (after.x - before.x, after.y - before.y), (hx, hy, hw, hh), (hx1 - hx, hy1 - hy))
+        touched = np.isfinite(impact)
+        order = np.argsort(impact[touched], kind='stable')
+        return rows[touched][order]
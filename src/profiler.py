@@ -0,0 +1,104 @@
+# Imports
+import os
+import csv
+import json
+import time
+import numpy as np
+import pygame
+
+from constants import *
+from saves import get_save_path
+
+
+# Per-phase frame timer: each mark() charges the time since the previous mark to a phase
+# Disabled, its methods are no-ops, so the calls can stay in the game loop
+class FrameProfiler:
+
+    def __init__(self, enabled=PROFILE, history=PROFILE_HISTORY):
+        self.enabled = enabled
+        self.history = history
+        self.samples = {} # Phase -> ring buffer of milliseconds per frame
+        self.current = {} # Phase -> milliseconds spent so far this frame
+        self.frames = 0
+        self.frame_started = 0
+        self.last = 0
+        self.overlay = None
+        self.overlay_updated = 0
+        if not enabled:
+            self.start_frame = self.mark = self.end_frame = self.skip
+
+    def skip(self, *args):
+        pass
+
+    ## Start timing a frame
+    def start_frame(self):
+        self.frame_started = self.last = time.perf_counter()
+
+    ## Charge the time since the last mark to `phase` (phases hit several times in a frame add up)
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + (now - self.last) * 1000
+        self.last = now
+
+    ## Store the frame's phase times (and its total) in the ring buffers
+    def end_frame(self):
+        self.current['frame'] = (time.perf_counter() - self.frame_started) * 1000
+        slot = self.frames % self.history
+        for phase in self.current:
+            if phase not in self.samples:
+                self.samples[phase] = np.zeros(self.history)
+        for phase, samples in self.samples.items():
+            samples[slot] = self.current.get(phase, 0)
+        self.frames += 1
+        self.current = {}
+
+    ## Samples of a phase, oldest first
+    def series(self, phase):
+        samples = self.samples[phase]
+        if self.frames < self.history:
+            return samples[:self.frames]
+        return np.roll(samples, -(self.frames % self.history))
+
+    ## p50/p95/p99, mean and max per phase over the history
+    def summary(self):
+        summary = {}
+        for phase in self.samples:
+            series = self.series(phase)
+            p50, p95, p99 = np.percentile(series, (50, 95, 99))
+            summary[phase] = {'p50': p50, 'p95': p95, 'p99': p99, 'mean': series.mean(), 'max': series.max()}
+        return summary
+
+    ## Table of the summary, refreshed every PROFILE_OVERLAY_INTERVAL ms
+    def render_overlay(self, font):
+        now = pygame.time.get_ticks()
+        if self.overlay is None or now - self.overlay_updated >= PROFILE_OVERLAY_INTERVAL:
+            lines = [f"{'phase':<11}{'p50':>6}{'p95':>6}{'p99':>6}"]
+            lines += [f"{phase:<11}{s['p50']:>6.1f}{s['p95']:>6.1f}{s['p99']:>6.1f}" for phase, s in self.summary().items()]
+            texts = [font.render(line, True, (255, 255, 255)) for line in lines]
+            height = sum(text.get_height() for text in texts)
+            self.overlay = pygame.Surface((max(text.get_width() for text in texts) + 8, height + 8), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 160))
+            y = 4
+            for text in texts:
+                self.overlay.blit(text, (4, y))
+                y += text.get_height()
+            self.overlay_updated = now
+        return self.overlay
+
+    ## Write the summary as JSON and the raw per-frame samples as CSV
+    def dump(self, app_name=GAME_TITLE, file_name=PROFILE_FILE_NAME):
+        if not self.frames:
+            return
+        save_path = get_save_path(app_name)
+        os.makedirs(save_path, exist_ok=True)
+        base = os.path.join(save_path, file_name)
+        with open(base + '.json', 'w') as file:
+            json.dump({'frames': self.frames, 'history': min(self.frames, self.history), 'phases': self.summary()}, file, indent=2)
+        with open(base + '.csv', 'w', newline='') as file:
+            writer = csv.writer(file)
+            phases = list(self.samples)
+            writer.writerow(['frame'] + [f'{phase}_ms' for phase in phases])
+            columns = [self.series(phase) for phase in phases]
+            first = self.frames - len(columns[0])
+            for row, values in enumerate(zip(*columns)):
+                writer.writerow([first + row] + [f'{value:.3f}' for value in values])
@@ -0,0 +1,189 @@
+# Imports
+import os
+import sys
+import time
+import struct
+import argparse
+import functools
+
+from constants import *
+from saves import get_save_path
+from simulation import Simulation, random_policy
+from dogs import DOG_TYPES, DOG_TYPE_IDS
+from collision import collision_masks
+from sprites import load_masks
+
+
+# Replay file layout: header, then (inputs, run length) pairs, each run length a LEB128 varint
+REPLAY_MAGIC = b'CDDREPL5' # Bumped whenever a change to the simulation makes older replays play out differently
+REPLAY_HEADER = struct.Struct('<8sQIBBI16s') # Magic, seed, starting border reaches, first dog, flags, ticks, final checksum
+NO_FIRST_DOG = 255 # First dog picked at random from the seed
+
+## Header flags: simulation modes a run was recorded in, which its playback has to use too
+FLAG_DOG_PATHS = 1 # Dogs walked closed-form paths (tuning['dog_paths'])
+FLAG_PIXEL_COLLISION = 2 # Hits were tested on the sprites' pixels (simulation.masks)
+
+
+# Functions
+
+## Run-length varints
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+# Per-tick input log of one run, stored as runs of unchanged key states
+class InputRecorder:
+
+    def __init__(self, seed, border_reaches=0, first_dog=None, flags=0):
+        self.seed = seed
+        self.border_reaches = border_reaches
+        self.first_dog = first_dog
+        self.flags = flags
+        self.runs = [] # [inputs, ticks held]
+        self.ticks = 0
+
+    ## Recorder for a simulation that was just (re)started
+    @classmethod
+    def start(cls, simulation):
+        flags = FLAG_DOG_PATHS if simulation.tuning['dog_paths'] else 0
+        if simulation.masks is not None:
+            flags |= FLAG_PIXEL_COLLISION
+        return cls(simulation.seed, simulation.border_reaches, simulation.first_dog, flags)
+
+    ## Simulation tuning the run was recorded with
+    def tuning(self):
+        return {'dog_paths': bool(self.flags & FLAG_DOG_PATHS)}
+
+    ## Log the input bitmask of one tick
+    def record(self, inputs):
+        runs = self.runs
+        if runs and runs[-1][0] == inputs:
+            runs[-1][1] += 1
+        else:
+            runs.append([inputs, 1])
+        self.ticks += 1
+
+    ## Inputs, one per tick
+    def inputs(self):
+        for inputs, count in self.runs:
+            for _ in range(count):
+                yield inputs
+
+    ## Encode with the checksum of the state the run ended in
+    def to_bytes(self, checksum):
+        first_dog = NO_FIRST_DOG if self.first_dog is None else DOG_TYPE_IDS[self.first_dog]
+        out = bytearray(REPLAY_HEADER.pack(REPLAY_MAGIC, self.seed, self.border_reaches, first_dog, self.flags, self.ticks, checksum))
+        for inputs, count in self.runs:
+            out.append(inputs)
+            write_varint(out, count)
+        return bytes(out)
+
+    ## Decode a replay, returns the recorder and the final checksum
+    @classmethod
+    def from_bytes(cls, data):
+        magic, seed, border_reaches, first_dog, flags, ticks, checksum = REPLAY_HEADER.unpack_from(data)
+        if magic[:-1] == REPLAY_MAGIC[:-1] and magic != REPLAY_MAGIC:
+            raise ValueError("replay recorded by another version of the simulation")
+        if magic != REPLAY_MAGIC:
+            raise ValueError("not a replay file")
+        recorder = cls(seed, border_reaches, None if first_dog == NO_FIRST_DOG else DOG_TYPES[first_dog], flags)
+        position = REPLAY_HEADER.size
+        while position < len(data):
+            inputs = data[position]
+            count, position = read_varint(data, position + 1)
+            recorder.runs.append([inputs, count])
+            recorder.ticks += count
+        if recorder.ticks != ticks:
+            raise ValueError(f"replay has {recorder.ticks} ticks, header says {ticks}")
+        return recorder, checksum
+
+    ## Write the replay (in the save directory unless the path is absolute)
+    def save(self, checksum, path=REPLAY_FILE_NAME):
+        if not os.path.isabs(path):
+            os.makedirs(get_save_path(), exist_ok=True)
+            path = os.path.join(get_save_path(), path)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(self.to_bytes(checksum))
+        os.replace(path + '.tmp', path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+## Playback
+
+### Collision masks the game tests pixel collision with, built once without a window
+@functools.cache
+def playback_masks():
+    return collision_masks(load_masks())
+
+### Step a fresh simulation through the recorded inputs as fast as possible
+def play(recorder, profiler=None):
+    simulation = Simulation(recorder.seed, recorder.border_reaches, profiler, first_dog=recorder.first_dog, tuning=recorder.tuning())
+    if recorder.flags & FLAG_PIXEL_COLLISION:
+        simulation.masks = playback_masks()
+    step = simulation.step
+    for inputs in recorder.inputs():
+        step(inputs)
+    return simulation
+
+### Replay a file and check it ends in the recorded state, returns (matches, ticks, seconds)
+def verify(path):
+    recorder, checksum = InputRecorder.load(path)
+    start = time.perf_counter()
+    simulation = play(recorder)
+    return simulation.checksum() == checksum, recorder.ticks, time.perf_counter() - start
+
+### Record a headless run with the random cat policy (e.g. to make a regression fixture)
+def record_headless(seed, max_ticks, border_reaches=0, tuning=None, pixel_collision=False):
+    simulation = Simulation(seed, border_reaches, first_dog=None, tuning=tuning)
+    if pixel_collision:
+        simulation.masks = playback_masks()
+    recorder = InputRecorder.start(simulation)
+    policy = random_policy(seed)
+    while recorder.ticks < max_ticks and not simulation.game_over:
+        inputs = policy(simulation)
+        recorder.record(inputs)
+        simulation.step(inputs)
+    return recorder, simulation
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description=f"Play back or record {GAME_TITLE} replays headless")
+    parser.add_argument('replays', nargs='*', help=f"Replay files to verify (default: the last run, {REPLAY_FILE_NAME} in the save directory)")
+    parser.add_argument('--record', metavar='FILE', help="Record a headless run with a random cat policy instead")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the recorded run")
+    parser.add_argument('--ticks', type=int, default=100_000, help="Most ticks to record")
+    parser.add_argument('--dog-paths', action=argparse.BooleanOptionalAction, default=DOG_PATHS, help="Record with dogs on closed-form paths")
+    parser.add_argument('--pixel-collision', action=argparse.BooleanOptionalAction, default=PIXEL_COLLISION, help="Record with hits tested on the sprites' pixels")
+    args = parser.parse_args()
+
+    if args.record:
+        recorder, simulation = record_headless(args.seed, args.ticks, tuning={'dog_paths': args.dog_paths}, pixel_collision=args.pixel_collision)
+        path = recorder.save(simulation.checksum(), os.path.abspath(args.record))
+        print(f"Recorded {recorder.ticks} ticks ({len(recorder.runs)} runs, {os.path.getsize(path)} bytes), score: {simulation.border_reaches}")
+        sys.exit(0)
+
+    failed = 0
+    for path in args.replays or [os.path.join(get_save_path(), REPLAY_FILE_NAME)]:
+        matches, ticks, elapsed = verify(path)
+        failed += not matches
+        print(f"{path}: {'ok' if matches else 'MISMATCH'}, {ticks} ticks in {elapsed:.2f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,66 @@
+# Imports
+import numpy as np
+
+from constants import *
+from dogs import DOG_TYPE_IDS
+
+
+# Functions
+
+### Dog type weights with `count` dogs in the level (bosses get likelier as the level fills up)
+def dog_weights(count, base_weights=DOG_BASE_WEIGHTS, boss_weight_increments=BOSS_WEIGHT_INCREMENTS):
+    weights = dict(base_weights)
+    # Increase the weight of exotic and boss dogs based on the number of dogs
+    for dog, increment in boss_weight_increments.items():
+        weights[dog] += count*increment
+    # Normalize weights
+    return {k: v / sum(weights.values()) for k, v in weights.items()}
+
+### Vose alias table: column i is kept with probability `keep[i]`, otherwise it stands for `alias[i]`
+def build_alias_table(probabilities):
+    n = len(probabilities)
+    scaled = np.asarray(probabilities, dtype=np.float64) * n
+    keep = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1]
+    large = [i for i in range(n) if scaled[i] >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        keep[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    # Whatever is left is 1 up to rounding error
+    return keep, alias
+
+
+# Weighted dog type draws: one alias table per dog count, built the first time that count is drawn from
+class DogSampler:
+
+    def __init__(self, base_weights=DOG_BASE_WEIGHTS, boss_weight_increments=BOSS_WEIGHT_INCREMENTS):
+        self.base_weights = base_weights
+        self.boss_weight_increments = boss_weight_increments
+        self.dogs = list(base_weights)
+        self.ids = np.array([DOG_TYPE_IDS[dog] for dog in self.dogs], dtype=np.int8)
+        self.tables = {} # Dog count -> (keep, alias)
+
+    def table(self, count):
+        table = self.tables.get(count)
+        if table is None:
+            weights = dog_weights(count, self.base_weights, self.boss_weight_increments)
+            table = self.tables[count] = build_alias_table([weights[dog] for dog in self.dogs])
+        return table
+
+    ## One dog type, in O(1): the integer part of one uniform draw picks the column, the fraction decides keep or alias
+    def pick(self, count, rng):
+        keep, alias = self.table(count)
+        u = rng.random() * len(keep)
+        column = int(u)
+        return self.dogs[column if u - column < keep[column] else alias[column]]
+
+    ## `size` dog type ids (indices into DOG_TYPES) at once
+    def sample(self, count, rng, size):
+        keep, alias = self.table(count)
+        u = rng.random(size) * len(keep)
+        columns = u.astype(np.int64)
+        return self.ids[np.where(u - columns < keep[columns], columns, alias[columns])]
@@ -0,0 +1,139 @@
+# Imports
+import os
+import platform
+import json
+import copy
+import time
+import atexit
+import threading
+
+from constants import *
+
+
+# Functions
+
+## Saving and loading
+
+### Get platform-specific path to save directory
+def get_save_path(app_name=GAME_TITLE):
+    try:
+        home = os.path.expanduser('~')
+        if platform.system() == 'Windows':
+            return os.path.join(os.getenv('APPDATA', home), app_name)
+        elif platform.system() == 'Darwin':  # macOS
+            return os.path.join(home, 'Library', 'Application Support', app_name)
+        else:  # Linux and other Unix-like OS
+            return os.path.join(home, '.local', 'share', app_name)
+    except Exception:
+        return os.path.join(os.getcwd(), app_name)
+
+### Save game data to file (written to a temporary file first, then swapped in atomically)
+def save_game_data(data, app_name=GAME_TITLE, file_name=SAVE_FILE_NAME):
+    save_path = get_save_path(app_name)
+    os.makedirs(save_path, exist_ok=True)
+    file_path = os.path.join(save_path, file_name)
+    with open(file_path + '.tmp', 'w') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(file_path + '.tmp', file_path)
+
+### Load game data from file
+def load_game_data(app_name=GAME_TITLE, file_name=SAVE_FILE_NAME):
+    file_path = os.path.join(get_save_path(app_name), file_name)
+    if os.path.exists(file_path):
+        with open(file_path, 'r') as file:
+            return json.load(file)
+    return {"highscore": 0}
+
+### Delete save data
+def delete_save_data(app_name=GAME_TITLE, file_name=SAVE_FILE_NAME):
+    file_path = os.path.join(get_save_path(app_name), file_name)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+# In-memory save store: reads never touch the disk, changes are written behind in batches
+class SaveStore:
+
+    def __init__(self, app_name=GAME_TITLE, file_name=SAVE_FILE_NAME, flush_delay=SAVE_FLUSH_DELAY):
+        self.app_name = app_name
+        self.file_name = file_name
+        self.flush_delay = flush_delay
+        self.data = {"highscore": 0}
+        self.data.update(load_game_data(app_name, file_name))
+        self.dirty = False
+        self.flushes = 0
+        self.lock = threading.Lock() # Guards data and dirty
+        self.write_lock = threading.Lock() # Serializes writes to the file
+        self.wake = threading.Event()
+        self.closed = False
+        self.writer = threading.Thread(target=self._write_behind, name='save-store', daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    ## Reading
+    def __getitem__(self, key):
+        with self.lock:
+            return self.data[key]
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    ## Changing values marks the store dirty and wakes the writer
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        with self.lock:
+            self.data.update(values)
+            self.dirty = True
+        self.wake.set()
+
+    ### Keep the best score
+    def write_high_score(self, score):
+        with self.lock:
+            self.data['highscore'] = max(score, self.data.get('highscore', 0))
+            self.dirty = True
+        self.wake.set()
+
+    ### Reset to a fresh save and remove the file
+    def delete(self):
+        with self.write_lock, self.lock:
+            self.data = {"highscore": 0}
+            self.dirty = False
+            delete_save_data(self.app_name, self.file_name)
+
+    ## Persisting
+
+    ### Write the current data if anything changed since the last write
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty:
+                    return False
+                snapshot = copy.deepcopy(self.data)
+                self.dirty = False
+            save_game_data(snapshot, self.app_name, self.file_name)
+            self.flushes += 1
+            return True
+
+    ### Writer thread: wait for a change, let more changes pile up for flush_delay, then write them in one go
+    def _write_behind(self):
+        while not self.closed:
+            self.wake.wait()
+            self.wake.clear()
+            if self.closed:
+                break
+            time.sleep(self.flush_delay)
+            self.flush()
+
+    ### Stop the writer and write whatever is left
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.writer.join(timeout=1)
+        self.flush()
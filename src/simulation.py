@@ -0,0 +1,336 @@
+# Imports
+import os
+import time
+import random
+import hashlib
+import pygame
+import numpy as np
+
+from constants import *
+from dogs import DogTable, SIMULATION_COLUMNS
+from collision import CollisionIndex, cat_pixels, pixels_overlap
+from sampler import DogSampler
+from paths import DogPaths
+from profiler import FrameProfiler
+
+
+# Input
+
+## Input flags (one bit per movement key)
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+
+## Simulation events
+EVENT_HIT = 'hit'
+EVENT_HARD_HIT = 'hard_hit'
+EVENT_LEVEL_COMPLETE = 'level_complete'
+EVENT_GAME_OVER = 'game_over'
+EVENT_BAND_FULL = 'band_full' # A level was completed but no lane had room for another dog
+
+
+# Functions
+
+## Input
+
+### Pack the pressed movement keys into input flags
+def read_inputs(keys):
+    inputs = 0
+    if keys[pygame.K_w]:
+        inputs |= INPUT_UP
+    if keys[pygame.K_s]:
+        inputs |= INPUT_DOWN
+    if keys[pygame.K_a]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_d]:
+        inputs |= INPUT_RIGHT
+    return inputs
+
+
+## Seeding
+
+### A fresh run seed (stored in the replay, so it can be anything)
+def new_seed():
+    return random.getrandbits(64)
+
+
+## Sprite dimensions
+
+### Size of a sprite frame after scaling, computed from the coordinate tables (no assets needed)
+def get_sprite_size(sprite, direction, frame=0):
+    _, _, width, height = SPRITE_COORDINATES[sprite][direction][frame]
+    return int(width * SPRITE_SCALES[0][sprite]), int(height * SPRITE_SCALES[1][sprite])
+
+CAT_SIZE = get_sprite_size('cat_grey', 'ID')
+DOG_SIZE = get_sprite_size('dog_white', 'E')
+BOSS_SIZE = get_sprite_size('boss_walking', 'E')
+
+
+## Spawning
+
+### Free spawn lanes: integer y positions in [lower, upper] further than `gap` from every dog
+# Returns the first position of each free interval and the running total of free positions up to its end
+def free_spawn_intervals(dog_ys, gap, lower, upper):
+    ys = np.sort(dog_ys)
+    # Each dog blocks [y - gap, y + gap]; with one gap for all dogs the blocked ends are sorted too
+    blocked_starts = np.ceil(ys - gap).astype(np.int64)
+    blocked_ends = np.floor(ys + gap).astype(np.int64)
+    starts = np.maximum(np.concatenate(([lower], blocked_ends + 1)), lower)
+    ends = np.minimum(np.concatenate((blocked_starts - 1, [upper])), upper)
+    # Overlapping blocks (and blocks past the band) leave empty intervals, which count as zero
+    lengths = np.maximum(ends - starts + 1, 0)
+    return starts, np.cumsum(lengths)
+
+### Dog spawn position, uniform over the free lanes of the spawn band (None when the band is full)
+def get_dog_spawn(dog_ys, border_reaches, rng=random, min_gap=MIN_GAP, gap_reduction=GAP_REDUCTION_FACTOR):
+    # Calculate dynamic gap for this turn (decreses with each border reach)
+    dynamic_gap = max(min_gap - border_reaches * gap_reduction, REF_DOG_WIDTH)
+    starts, free = free_spawn_intervals(dog_ys, dynamic_gap, VIEWPORT_BUFFER, DOG_START_Y)
+    if free[-1] == 0:
+        return None
+    # Pick the k-th free position and find its interval by binary search
+    k = rng.randrange(int(free[-1]))
+    i = int(np.searchsorted(free, k, side='right'))
+    spawn_pos = int(starts[i]) + k - (int(free[i - 1]) if i else 0)
+    return (REF_DOG_WIDTH, spawn_pos)
+
+
+## Difficulty parameters a simulation can override (e.g. for tuning sweeps)
+TUNING = {
+    'dog_weights': DOG_BASE_WEIGHTS,
+    'boss_weight_increments': BOSS_WEIGHT_INCREMENTS,
+    'min_gap': MIN_GAP,
+    'gap_reduction': GAP_REDUCTION_FACTOR,
+    'dog_speed_cap': DOG_SPEED_CAP,
+    'dog_paths': DOG_PATHS,
+}
+
+
+# Simulation
+class Simulation:
+
+    def __init__(self, seed=None, border_reaches=0, profiler=None, first_dog='dog_white', tuning=None):
+        self.profiler = profiler or FrameProfiler(enabled=False)
+        self.tuning = {**TUNING, **(tuning or {})}
+        self.sampler = DogSampler(self.tuning['dog_weights'], self.tuning['boss_weight_increments'])
+        self.collisions = CollisionIndex()
+        self.masks = None # Collision masks: when set, sprite pixels instead of hitboxes decide hits (without dog paths)
+        self.restart(seed, border_reaches, first_dog)
+
+    ## Start a run from a seed (a fresh one if none is given): every random draw of the run comes from it
+    def restart(self, seed=None, border_reaches=0, first_dog=None):
+        if seed is None:
+            seed = new_seed()
+        self.seed = seed
+        self.first_dog = first_dog
+        self.random = random.Random(seed)
+        self.np_random = np.random.default_rng(seed)
+        self.tick = 0
+        self.time = 0
+        self.reset(border_reaches, first_dog)
+
+    ## Start a new run
+    def reset(self, border_reaches=0, first_dog=None):
+        self.border_reaches = border_reaches
+        self.health = DEFAULT_HEALTH
+        self.last_hit = -IMMUNITY_TIME - 1
+        self.last_hit_by = None # Type of the dog that hit the cat last (the cause of death after a game over)
+        self.game_over = False
+
+        ### Cat
+        self.cat_rect = pygame.Rect((0, 0), CAT_SIZE)
+        self.cat_rect.center = (WINDOW_WIDTH // 2, CAT_START_Y)
+        self.cat_before = self.cat_rect.copy() # Where the cat started the last tick
+        self.viewport_y = WORLD_HEIGHT - WINDOW_HEIGHT
+        self.horizontal_cat_movement = 0
+        self.vertical_cat_movement = 0
+        self.cat_facing = 'N' # Direction the cat last faced, which picks its standing frame (for pixel hits)
+
+        ### Dogs
+        self.dogs = DogTable()
+        self.paths = DogPaths() if self.tuning['dog_paths'] else None
+        self.add_dog(first_dog or self.pick_dog(), (REF_DOG_WIDTH, DOG_START_Y), 'E')
+
+    ## Append a dog to the dog table
+    def add_dog(self, dog, center, facing):
+        i = self.dogs.add(dog, center, BOSS_SIZE if dog in DOUBLE_DAMAGE_DOGS else DOG_SIZE, facing)
+        if self.paths:
+            self.paths.add(self.dogs, [i], self.paths.draw_steps(1, self.border_reaches, self.np_random, self.tuning['dog_speed_cap']))
+        return i
+
+    ## Advance the simulation by one tick
+    def step(self, inputs=0):
+        events = []
+        if self.game_over:
+            return events
+        cat_rect = self.cat_rect
+        self.cat_before = cat_rect.copy()
+        self.horizontal_cat_movement = 0
+        self.vertical_cat_movement = 0
+
+        ### Horizontal movement with boundary check
+        if inputs & INPUT_LEFT and cat_rect.x > 0:
+            self.horizontal_cat_movement = -1
+        if inputs & INPUT_RIGHT and cat_rect.x < WINDOW_WIDTH - cat_rect.width:
+            self.horizontal_cat_movement = 1
+
+        ### Vertical movement with boundary check
+        if inputs & INPUT_UP and cat_rect.y > self.viewport_y - cat_rect.height:
+            self.viewport_y = max(0, self.viewport_y - CAT_SPEED_Y)
+            self.vertical_cat_movement = 1
+        if inputs & INPUT_DOWN and cat_rect.y < WORLD_HEIGHT - cat_rect.height:
+            self.viewport_y = min(WORLD_HEIGHT - WINDOW_HEIGHT, self.viewport_y + CAT_SPEED_Y)
+            self.vertical_cat_movement = -1
+
+        ### Apply cat movement
+        cat_rect.x += self.horizontal_cat_movement * CAT_SPEED_X
+        cat_rect.y -= self.vertical_cat_movement * CAT_SPEED_Y
+        self.profiler.mark('cat')
+
+        self.move_dogs()
+        self.profiler.mark('dogs')
+
+        ### Check for border collision
+        if cat_rect.top <= self.viewport_y - cat_rect.height:
+            events.append(EVENT_LEVEL_COMPLETE)
+            if not self.complete_level():
+                events.append(EVENT_BAND_FULL)
+
+        ### Check for dog collision
+        hit = self.check_collisions()
+        if hit is not None:
+            events.append(hit)
+        self.profiler.mark('collision')
+
+        self.tick += 1
+        self.time = self.tick * TICK_MS
+        return events
+
+    ## Picking the next dog with this run's weights
+    def pick_dog(self):
+        return self.sampler.pick(len(self.dogs), self.np_random)
+
+    ## Dog movement (walking back and forth)
+    def move_dogs(self):
+        if self.paths:
+            # Nothing to do per dog: rows are written from their paths when they are hit-tested or drawn
+            self.paths.time += 1
+        else:
+            self.dogs.move(self.border_reaches, self.np_random, self.tuning['dog_speed_cap'])
+
+    ## Bring the rows of dogs in view up to date (dogs on paths are only written when something reads them)
+    def sync_dogs(self):
+        if self.paths:
+            self.paths.write(self.dogs, self.paths.rows_between(self.viewport_y, self.viewport_y + WINDOW_HEIGHT))
+
+    ## Reaching the border: add a dog (if there is room for one) and send the cat back to the start
+    def complete_level(self):
+        self.border_reaches += 1
+        if self.paths:
+            # Every dog walks the new level at a new speed
+            rows = np.arange(len(self.dogs))
+            self.paths.write(self.dogs, rows)
+            steps = self.paths.draw_steps(len(rows), self.border_reaches, self.np_random, self.tuning['dog_speed_cap'])
+            self.paths.anchor(self.dogs, rows, steps, self.dogs.horizontal.copy(), self.dogs.vertical.copy())
+        picked_dog = self.pick_dog()
+        dog_spawn = get_dog_spawn(self.dogs.y, self.border_reaches, self.random, self.tuning['min_gap'], self.tuning['gap_reduction'])
+        if dog_spawn is not None:
+            self.add_dog(picked_dog, dog_spawn, self.random.choice(['E', 'W']))
+        self.cat_rect.y = CAT_RESPAWN_Y
+        self.cat_before = self.cat_rect.copy() # Respawning is a jump, not a move to sweep
+        self.viewport_y = WORLD_HEIGHT - WINDOW_HEIGHT
+        return dog_spawn is not None
+
+    ## Cat vs dog hits, returns the hit event (if any)
+    def check_collisions(self):
+        event = None
+        cat_hitbox = self.cat_rect.scale_by(CAT_HITBOX_SCALE_X, CAT_HITBOX_SCALE_Y)
+        dogs = self.dogs
+        if self.paths:
+            # Anything the cat touched during the tick, not only where both ended up
+            cat_before = self.cat_before.scale_by(CAT_HITBOX_SCALE_X, CAT_HITBOX_SCALE_Y)
+            rows = self.paths.rows_between(min(cat_before.top, cat_hitbox.top), max(cat_before.bottom, cat_hitbox.bottom))
+            self.paths.write(dogs, rows)
+            hits = self.paths.sweep(dogs, rows, cat_before, cat_hitbox)
+        elif self.masks:
+            # The areas the cat and the dogs are drawn in find the dogs near the cat, their pixels decide which ones hit
+            cat_mask, self.cat_facing, offset = cat_pixels(self.masks, self.horizontal_cat_movement, self.vertical_cat_movement, self.cat_facing)
+            cat_area = pygame.Rect((self.cat_rect.x + offset[0], self.cat_rect.y + offset[1]), cat_mask.get_size())
+            self.collisions.update(dogs)
+            hits = [i for i in self.collisions.query_sprites(cat_area, self.masks['sizes']) if pixels_overlap(self.masks, dogs, i, cat_mask, cat_area.topleft)]
+        else:
+            self.collisions.update(dogs)
+            hits = self.collisions.query(cat_hitbox)
+        for i in hits:
+            if self.time - self.last_hit <= IMMUNITY_TIME:
+                continue
+            self.last_hit_by = dogs.type_of(i)
+            if self.health <= 0:
+                self.game_over = True
+                return EVENT_GAME_OVER
+            self.last_hit = self.time
+            if dogs.type_of(i) in DOUBLE_DAMAGE_DOGS:
+                self.health -= 2
+                event = EVENT_HARD_HIT
+            else:
+                self.health -= 1
+                event = EVENT_HIT
+            if self.paths:
+                self.paths.anchor(dogs, [i], self.paths.step[[i]], -dogs.horizontal[[i]]*4, [self.vertical_cat_movement*2])
+            else:
+                dogs.horizontal[i] = -dogs.horizontal[i]*4
+                dogs.vertical[i] = self.vertical_cat_movement*2
+        return event
+
+
+    ## Hash of everything the simulation owns, to check that a replay ended in the same state
+    def checksum(self):
+        digest = hashlib.blake2b(digest_size=16)
+        cat_rect = self.cat_rect
+        state = (self.tick, self.border_reaches, self.health, self.last_hit, self.game_over, self.viewport_y,
+                 cat_rect.x, cat_rect.y, cat_rect.width, cat_rect.height, self.horizontal_cat_movement, self.vertical_cat_movement)
+        digest.update(repr(state).encode())
+        if self.paths:
+            # Rows in view are written by the renderer, so the paths are the state
+            digest.update(np.int64(self.paths.time).tobytes())
+            for column in (self.dogs.kind, self.dogs.width, self.dogs.height, *self.paths.anchors.values()):
+                digest.update(np.ascontiguousarray(column).tobytes())
+        else:
+            for column in SIMULATION_COLUMNS:
+                digest.update(np.ascontiguousarray(getattr(self.dogs, column)).tobytes())
+        return digest.digest()
+
+
+## Headless running
+
+### Run the simulation without a window, returns the number of ticks stepped
+def run_headless(simulation, policy, max_ticks):
+    for _ in range(max_ticks):
+        simulation.step(policy(simulation))
+        if simulation.game_over:
+            break
+    return simulation.tick
+
+### Random cat policy: press a random combination of movement keys, each held for `hold_ticks` ticks
+# Draws from its own generator, so it doesn't shift the simulation's spawns and its inputs can be replayed
+def random_policy(seed=None, hold_ticks=1):
+    rng = random.Random(seed)
+    state = {'inputs': 0, 'held': 0}
+
+    def policy(simulation):
+        if state['held'] == 0:
+            state['inputs'] = rng.randint(0, INPUT_UP | INPUT_DOWN | INPUT_LEFT | INPUT_RIGHT)
+            state['held'] = hold_ticks
+        state['held'] -= 1
+        return state['inputs']
+    return policy
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    simulation = Simulation(seed=0)
+    start = time.perf_counter()
+    ticks = run_headless(simulation, random_policy(0), 100_000)
+    elapsed = time.perf_counter() - start
+    print(f"{ticks} ticks in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s), score: {simulation.border_reaches}")
@@ -0,0 +1,89 @@
+# Imports
+import numpy as np
+import pygame
+
+from constants import *
+
+
+# Characters of one frame: culled against the window, then drawn back to front in one blits() call
+# With a scale, images and draw positions are in target pixels (e.g. the pixel canvas); culling and rects stay in window pixels
+class SpriteBatch:
+
+    def __init__(self, size=(WINDOW_WIDTH, WINDOW_HEIGHT), scale=1):
+        self.screen = pygame.Rect((0, 0), size)
+        self.scale = scale # Window pixels per target pixel
+        self.viewport_y = 0
+        self.sprites = [] # (depth, image, target position, world rect, type)
+        self.rects = [] # Screen area of each sprite (its image and, for debug drawing, its rect)
+        self.order = None # Queued sprites back to front, sorted on the first draw
+        self.drawn = 0 # Sprite blits this frame (a sprite overlapping several dirty areas counts once per area)
+        self.culled = 0
+
+    ## Start a frame seen from `viewport_y`
+    def begin(self, viewport_y):
+        self.viewport_y = viewport_y
+        self.sprites = []
+        self.rects = []
+        self.order = None
+        self.drawn = 0
+        self.culled = 0
+
+    ## Rows of a table whose boxes (world coordinates) reach into the window, the rest count as culled
+    def visible(self, x, y, width, height):
+        top = self.screen.top + self.viewport_y
+        bottom = self.screen.bottom + self.viewport_y
+        rows = np.flatnonzero((y < bottom) & (y + height > top) & (x < self.screen.right) & (x + width > self.screen.left))
+        self.culled += len(x) - len(rows)
+        return rows
+
+    ## Queue a sprite drawn at its world rect moved by `offset`, unless it is off-screen
+    def add(self, image, rect, offset=(0, 0), type=None):
+        scale = self.scale
+        x, y = rect.x + offset[0], rect.y + offset[1]
+        area = pygame.Rect(x, y - self.viewport_y, image.get_width() * scale, image.get_height() * scale).union(rect.move(0, -self.viewport_y))
+        if not self.screen.colliderect(area):
+            self.culled += 1
+            return
+        # Positions snap to the world's pixel grid, so characters don't shimmer against the ground while it scrolls
+        self.sprites.append((rect.bottom, image, (x // scale, y // scale - self.viewport_y // scale), rect, type))
+        self.rects.append(area)
+        self.order = None
+
+    ## Queue rows that passed visible(), drawn without offsets at their (x, y) columns
+    def add_rows(self, images, x, y, width, height, type=None):
+        viewport_y = self.viewport_y
+        scale = self.scale
+        for image, x, y, width, height in zip(images, x.tolist(), y.tolist(), width.tolist(), height.tolist()):
+            image_width, image_height = image.get_size()
+            self.sprites.append((y + height, image, (x // scale, y // scale - viewport_y // scale), pygame.Rect(x, y, width, height), type))
+            self.rects.append(pygame.Rect(x, y - viewport_y, max(width, image_width * scale), max(height, image_height * scale)))
+        self.order = None
+
+    ## Draw the queued sprites, or only those overlapping `area` of the window (lower sprites in front)
+    def draw(self, target, area=None):
+        sprites = self.sprites
+        if self.order is None:
+            self.order = sorted(range(len(sprites)), key=lambda i: sprites[i][0])
+        order = self.order
+        if area is not None:
+            overlapping = set(area.collidelistall(self.rects))
+            order = [i for i in order if i in overlapping]
+        target.blits([(sprites[i][1], sprites[i][2]) for i in order], doreturn=False)
+        self.drawn += len(order)
+        if DEBUG:
+            for i in order:
+                self.draw_bounds(target, *sprites[i][2:])
+
+    ## Sprite bounds (red) and hitbox (green)
+    def draw_bounds(self, target, position, rect, type):
+        scale = self.scale
+        pygame.draw.rect(target, (255, 0, 0), (*position, rect.width // scale, rect.height // scale), 1)
+        if type == "cat":
+            collision_rect = rect.scale_by(CAT_HITBOX_SCALE_X, CAT_HITBOX_SCALE_Y)
+        else:
+            collision_rect = rect.scale_by(DOG_HITBOX_SCALE_X, DOG_HITBOX_SCALE_Y)
+        collision_rect.y -= self.viewport_y
+        pygame.draw.rect(target, (0, 255, 0), (collision_rect.x // scale, collision_rect.y // scale, collision_rect.width // scale, collision_rect.height // scale), 1)
+
+    def stats(self):
+        return {'drawn': self.drawn, 'culled': self.culled, 'queued': len(self.sprites)}
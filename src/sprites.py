@@ -0,0 +1,60 @@
+# Imports
+import pygame
+
+from constants import *
+from bake import asset_path
+from surfaces import display_format
+
+
+# Functions
+
+### Cutting one frame out of a sprite sheet (scaled, unless the scales are None)
+# Without a window the frame keeps the sheet's alpha as it is, so its collision mask comes out the same
+def get_sprite(sheet, x, y, width, height, scale_x, scale_y):
+    sprite = display_format(pygame.Surface((width, height), pygame.SRCALPHA), alpha=True)
+    sprite.blit(sheet, (0, 0), (x, y, width, height))
+    if scale_x and scale_y:
+        sprite = scale_frame(sprite, scale_x, scale_y)
+    return sprite
+
+def scale_frame(frame, scale_x, scale_y):
+    width, height = frame.get_size()
+    return pygame.transform.scale(frame, (width*scale_x, height*scale_y))
+
+### Frames of every direction cut at source size (what the bake cache stores)
+def cut_sprites(sheet, coordinates):
+    return {direction: [get_sprite(sheet, *coord, None, None) for coord in coordinates] for direction, coordinates in coordinates.items()}
+
+### Scaling cut frames, mirroring the east frames for sprites without west ones (and taking their collision masks)
+def scale_sprites(frames, scale_x, scale_y, masks=None):
+    sprites = {direction: [scale_frame(frame, scale_x, scale_y) for frame in frames] for direction, frames in frames.items()}
+    if 'E' in sprites and 'W' not in sprites:
+        sprites['W'] = [pygame.transform.flip(sprite, True, False) for sprite in sprites['E']]
+    if masks is not None:
+        masks.update(generate_masks(sprites))
+    return sprites
+
+def generate_sprites(sheet, coordinates, scale_x, scale_y, masks=None):
+    return scale_sprites(cut_sprites(sheet, coordinates), scale_x, scale_y, masks)
+
+### Gameplay sprites from source-size frames: the characters (with their masks, if asked for) and the grass tiles
+def build_sprites(frames, masks=None):
+    sprites = {sprite: scale_sprites(frames[sprite], SPRITE_SCALES[0][sprite], SPRITE_SCALES[1][sprite], None if masks is None else masks.setdefault(sprite, {})) for sprite in SPRITE_LIST}
+    sprites['grass'] = [scale_frame(tile, TILE_SCALE, TILE_SCALE) for tile in frames['grass']]
+    return sprites
+
+### Sprites of every direction shrunk `scale` times (nearest neighbor), e.g. for drawing into the pixel canvas
+def shrink_sprites(sprites, scale):
+    return {direction: [pygame.transform.scale(frame, (round(frame.get_width() / scale), round(frame.get_height() / scale))) for frame in frames] for direction, frames in sprites.items()}
+
+### Collision mask of every frame, per direction like the sprites
+def generate_masks(sprites):
+    return {direction: [pygame.mask.from_surface(frame) for frame in frames] for direction, frames in sprites.items()}
+
+### Collision masks of the characters straight from their sheets, without a window (what replays verify pixel collision with)
+def load_masks():
+    masks = {}
+    for sprite in SPRITE_LIST:
+        frames = cut_sprites(pygame.image.load(asset_path('sprites', f'{sprite}.png')), SPRITE_COORDINATES[sprite])
+        scale_sprites(frames, SPRITE_SCALES[0][sprite], SPRITE_SCALES[1][sprite], masks.setdefault(sprite, {}))
+    return masks
@@ -0,0 +1,12 @@
+# Imports
+import pygame
+
+
+# Functions
+
+### Surface in the display's pixel format for fast blits, once there is a window
+# Headless runs (benchmarks, replays, batch workers) get the surface as it is, or a copy of it
+def display_format(surface, alpha=False, copy=False):
+    if pygame.display.get_surface() is not None:
+        return surface.convert_alpha() if alpha else surface.convert()
+    return surface.copy() if copy else surface
@@ -0,0 +1,65 @@
+# Imports
+from collections import OrderedDict
+import pygame
+
+from constants import *
+from surfaces import display_format
+
+
+# Cache of rendered text surfaces, keyed on (string, color, size, shadow)
+class TextCache:
+
+    def __init__(self, font_path, size, font=None, capacity=TEXT_CACHE_SIZE):
+        self.font_path = font_path
+        self.size = size
+        self.fonts = {size: font} if font else {}
+        self.capacity = capacity
+        self.surfaces = OrderedDict() # Key -> surface, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.rasterizations = 0 # font.render calls
+
+    ## Font for a size, loaded on first use
+    def font(self, size=None):
+        size = size or self.size
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(self.font_path, size)
+        return self.fonts[size]
+
+    ## Text surface; with a shadow color the shadow is baked in at shadow_offset (the text stays at the origin)
+    def render(self, text, color, size=None, shadow=None, shadow_offset=(2, 2)):
+        key = (text, tuple(color), size or self.size, tuple(shadow) if shadow else None, shadow_offset if shadow else None)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        font = self.font(size)
+        surface = font.render(text, True, color)
+        self.rasterizations += 1
+        if shadow:
+            text_surface = surface
+            shadow_surface = font.render(text, True, shadow)
+            self.rasterizations += 1
+            surface = pygame.Surface((text_surface.get_width() + shadow_offset[0], text_surface.get_height() + shadow_offset[1]), pygame.SRCALPHA)
+            surface.blit(shadow_surface, shadow_offset)
+            surface.blit(text_surface, (0, 0))
+        surface = display_format(surface, alpha=True)
+
+        self.surfaces[key] = surface
+        while len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    ## Hit/miss counters, e.g. to check that a steady-state frame rasterizes nothing
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'rasterizations': self.rasterizations,
+            'entries': len(self.surfaces),
+            'hit_rate': self.hits / lookups if lookups else 1,
+        }
@@ -0,0 +1,148 @@
+# Imports
+import pygame
+
+from constants import *
+from surfaces import display_format
+
+
+# Functions
+
+## Easing
+def linear(t):
+    return t
+
+### Up to the peak halfway through, then back down
+def rise_and_fall(t):
+    return 1 - abs(2 * t - 1)
+
+
+# A value moving from `start` to `end` over `duration` ms, `delay` ms after its effect started
+class Tween:
+
+    def __init__(self, start, end, duration, delay=0, easing=linear):
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.delay = delay
+        self.easing = easing
+
+    ## Value `elapsed` ms into the effect (held at the ends)
+    def value(self, elapsed):
+        if self.duration <= 0:
+            t = 1 if elapsed >= self.delay else 0
+        else:
+            t = min(max((elapsed - self.delay) / self.duration, 0), 1)
+        return self.start + (self.end - self.start) * self.easing(t)
+
+
+# Full-window color overlay with an animated alpha
+class Overlay:
+
+    def __init__(self, color, alpha, size=(WINDOW_WIDTH, WINDOW_HEIGHT)):
+        self.surface = display_format(pygame.Surface(size))
+        self.surface.fill(color)
+        self.color = color
+        self.alpha = alpha
+
+    def draw(self, target, elapsed):
+        alpha = int(self.alpha.value(elapsed))
+        if alpha >= 255:
+            target.fill(self.color, self.surface.get_rect()) # A surface alpha of 255 takes a much slower blit path than a fill
+        elif alpha > 0:
+            self.surface.set_alpha(alpha)
+            target.blit(self.surface, (0, 0))
+
+
+# Surface centered on a point, shown from `start` ms on, with optional alpha and scale tweens
+class Layer:
+
+    def __init__(self, surface, center, alpha=None, scale=None, start=0):
+        self.surface = surface
+        self.center = center
+        self.alpha = alpha
+        self.scale = scale
+        self.start = start
+
+    ## Surface shown `elapsed` ms into the effect
+    def frame(self, elapsed):
+        surface = self.surface
+        if self.scale:
+            scale = self.scale.value(elapsed)
+            surface = pygame.transform.scale(surface, (int(surface.get_width() * scale), int(surface.get_height() * scale)))
+        return surface
+
+    def draw(self, target, elapsed):
+        if elapsed < self.start:
+            return
+        surface = self.frame(elapsed)
+        if self.alpha:
+            surface.set_alpha(int(self.alpha.value(elapsed)))
+        target.blit(surface, surface.get_rect(center=self.center))
+
+
+# Layer playing a pre-rendered ScaleClip: the scale tween picks a frame instead of scaling the surface
+class ClipLayer(Layer):
+
+    def __init__(self, clip, center, scale, alpha=None, start=0):
+        super().__init__(clip.frames[-1], center, alpha=alpha, start=start)
+        self.clip = clip
+        self.clip_scale = scale
+
+    def frame(self, elapsed):
+        return self.clip.frame(self.clip_scale.value(elapsed))
+
+
+# Timed set of layers advanced by the frame clock; `pauses` holds the simulation while it runs
+class Effect:
+
+    def __init__(self, layers, duration, pauses=False, on_finish=None):
+        self.layers = layers
+        self.duration = duration
+        self.pauses = pauses
+        self.on_finish = on_finish
+        self.elapsed = 0
+
+    @property
+    def done(self):
+        return self.elapsed >= self.duration
+
+    ## Advance by `dt` ms of frame time
+    def update(self, dt):
+        if self.done:
+            return
+        self.elapsed += dt
+        if self.done and self.on_finish:
+            self.on_finish()
+
+    ## Draw over the finished frame
+    def draw(self, target):
+        for layer in self.layers:
+            layer.draw(target, self.elapsed)
+
+
+# Running effects, composited in start order over each frame
+class Transitions:
+
+    def __init__(self):
+        self.effects = []
+        self.was_visible = False # Whether an effect was drawn last frame (its pixels need redrawing)
+
+    ## Start an effect alongside the running ones
+    def start(self, effect):
+        self.effects.append(effect)
+        return effect
+
+    ## Whether a running effect holds the simulation
+    def paused(self):
+        return any(effect.pauses for effect in self.effects)
+
+    ## Advance every effect by one frame's time and drop the finished ones
+    def update(self, dt):
+        self.was_visible = bool(self.effects)
+        for effect in self.effects:
+            effect.update(dt)
+        self.effects = [effect for effect in self.effects if not effect.done]
+
+    def draw(self, target):
+        for effect in self.effects:
+            effect.draw(target)
@@ -0,0 +1,119 @@
+# Imports
+import random
+from collections import OrderedDict
+import pygame
+
+from constants import *
+from noise import noise_alpha
+from overlays import make_gradient, make_overlay
+from surfaces import display_format
+
+
+# Functions
+
+## Drawing world tiles
+def fill_with_tiles(surface, texture_sets, rng, top=0):
+    # Tiles stay aligned to the world grid whatever the chunk offset
+    for y in range(-(top % TILE_SIZE), surface.get_height(), TILE_SIZE):
+        for x in range(0, surface.get_width(), TILE_SIZE):
+            for texture_set in texture_sets:
+                chosen_texture = rng.choice(texture_set)
+                surface.blit(chosen_texture, (x, y))
+
+## Drawing noise
+def draw_noise(surface, seed, top=0, frequency=NOISE_OCTAVES, octaves=NOISE_LAYERS):
+    surface.blit(make_overlay(noise_alpha(surface.get_width(), surface.get_height(), top, frequency, octaves, seed=seed)), (0, 0))
+
+## Drawing the level border (fades to black towards the top)
+def draw_level_border(surface, top=0):
+    if top < BORDER_Y + BORDER_HEIGHT and BORDER_Y < top + surface.get_height():
+        surface.blit(make_gradient((surface.get_width(), BORDER_HEIGHT), (0, 0, 0), 255, 0), (0, BORDER_Y - top))
+
+
+# Chunked world background, generated lazily around the viewport
+class World:
+
+    def __init__(self, texture_sets, seed=None, height=WORLD_HEIGHT, chunk_height=WORLD_CHUNK_HEIGHT, cache_size=WORLD_CHUNK_CACHE, baked=None, scale=1):
+        self.texture_sets = texture_sets
+        self.baked = baked or {} # Chunk index -> prebuilt surface (e.g. from the bake cache)
+        self.seed = random.randint(1, 10**5) if seed is None else seed
+        self.height = height # None for an endless world
+        self.chunk_height = chunk_height
+        self.scale = scale # Chunks are generated full size and cached shrunk by this factor (e.g. for the pixel canvas)
+        self.cached_height = chunk_height // scale # Height of a cached chunk; blits and prefetching work in its pixels
+        self.cache_size = cache_size
+        self.chunks = OrderedDict() # Chunk index -> surface, least recently used first
+        self.generated = 0
+        self.evicted = 0
+
+    ## Number of chunks (None when endless)
+    def chunk_count(self):
+        if self.height is None:
+            return None
+        return -(-self.height // self.chunk_height)
+
+    ## Render one chunk: tiles picked from a per-chunk seed, then noise and border
+    def generate_chunk(self, index):
+        baked = self.baked.get(index)
+        if baked is not None:
+            return display_format(baked, copy=True)
+        top = index * self.chunk_height
+        height = self.chunk_height if self.height is None else min(self.chunk_height, self.height - top)
+        chunk = display_format(pygame.Surface((WORLD_WIDTH, height)))
+        fill_with_tiles(chunk, self.texture_sets, random.Random(f"{self.seed}/{index}"), top)
+        draw_noise(chunk, self.seed, top)
+        draw_level_border(chunk, top)
+        self.generated += 1
+        return chunk
+
+    ## Generate every chunk of a finite world (for baking)
+    def generate_all(self):
+        return {index: self.generate_chunk(index) for index in range(self.chunk_count())}
+
+    ## Cached chunk surface, generated on first use; evicts the least recently used chunk when full
+    def chunk(self, index):
+        chunk = self.chunks.get(index)
+        if chunk is not None:
+            self.chunks.move_to_end(index)
+            return chunk
+        chunk = self.chunks[index] = self.shrink(self.generate_chunk(index))
+        while len(self.chunks) > self.cache_size:
+            self.chunks.popitem(last=False)
+            self.evicted += 1
+        return chunk
+
+    ## Chunk surface shrunk to the cache's scale (nearest neighbor: at TILE_SCALE every tile pixel stays one pixel)
+    def shrink(self, chunk):
+        if self.scale == 1:
+            return chunk
+        return pygame.transform.scale(chunk, (chunk.get_width() // self.scale, chunk.get_height() // self.scale))
+
+    ## Indices of the chunks overlapping (cached) world rows [top, bottom)
+    def chunk_range(self, top, bottom):
+        first = max(0, top // self.cached_height)
+        last = (bottom - 1) // self.cached_height
+        if self.height is not None:
+            last = min(last, self.chunk_count() - 1)
+        return range(first, last + 1)
+
+    ## Blit the world area `area` (in world coordinates, divided by the scale) to `target` at `dest`
+    def blit_area(self, target, dest, area):
+        area = pygame.Rect(area)
+        for index in self.chunk_range(area.top, area.bottom):
+            top = index * self.cached_height
+            chunk = self.chunk(index)
+            part = area.clip(pygame.Rect(0, top, chunk.get_width(), chunk.get_height()))
+            if part.width and part.height:
+                target.blit(chunk, (dest[0] + part.x - area.x, dest[1] + part.y - area.y), part.move(0, -top))
+
+    ## Blit the visible slice of the world and prepare the chunks next to it
+    def blit_visible(self, target, viewport_y, width=WINDOW_WIDTH, height=WINDOW_HEIGHT):
+        self.blit_area(target, (0, 0), (0, viewport_y, width, height))
+        self.prefetch(viewport_y, height)
+
+    ## Generate the chunks within one chunk above and below the viewport ahead of time
+    def prefetch(self, viewport_y, height=WINDOW_HEIGHT):
+        for index in self.chunk_range(viewport_y - self.cached_height, viewport_y + height + self.cached_height):
+            if index not in self.chunks:
+                self.chunk(index)
+                return # At most one chunk per frame